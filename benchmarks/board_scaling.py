@@ -0,0 +1,196 @@
+"""
+Scaling benchmark of GraphPlan on square boards of growing size: generates boards from 6x6 up to
+the largest requested size, solves them, and reports per board the expansion time and the extraction
+time (the ones the --stats of graphplan.py reports, see planning/stats.py), the number of levels of
+the graph and the peak memory (measured with tracemalloc in a second run, so that it does not slow
+down the timed one).
+
+Boards are generated by placing the vehicles around the main vehicle X parked at the exit, and then
+scrambling the board with random legal moves, so every generated board is solvable. The exit is on
+row (N - 1) // 2, like row 2 of the 6x6 boards. Vehicles are named by the upper case letters,
+so a board holds at most 25 vehicles besides X.
+
+Usage: python3 benchmarks/board_scaling.py [--sizes N ...] [--boards K] [--timeout S] [--csv FILE]
+e.g. python3 benchmarks/board_scaling.py --sizes 6 8 10 12 --boards 2 --timeout 60
+"""
+
+import argparse
+import csv
+import os
+import random
+import string
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from planning.budget import BudgetExhausted
+from planning.graph_plan import GraphPlan
+from planning.rushhour import compile_board
+from planning.stats import PlanStats
+
+DEFAULT_SIZES = [6, 7, 8, 9, 10, 12]
+FIELDS = [
+    "size",
+    "seed",
+    "vehicles",
+    "propositions",
+    "actions",
+    "status",
+    "levels",
+    "plan_actions",
+    "expansion_s",
+    "extraction_s",
+    "peak_kb",
+]
+
+
+def generate_board(size, seed, density=0.6, moves=None):
+    """
+    Returns the rows of a solvable size x size board and its number of vehicles (X excluded):
+    vehicles of length 2 and 3 are placed at random until density of the cells are occupied
+    (or the letters run out), with X at the exit, then moves random legal moves (50 * size * size
+    by default) scramble the board. The board returned is the state of the scrambling
+    with the most vehicles between X and the exit, and then with X the farthest from the exit
+    """
+    rng = random.Random(seed)
+    exit_row = (size - 1) // 2
+    vehicles = {"X": [size - 2, exit_row, 2, True]}  # letter -> [x, y, length, horizontal]
+    occupied = {(size - 2, exit_row), (size - 1, exit_row)}
+
+    def cells(x, y, length, horizontal):
+        return [(x + i, y) if horizontal else (x, y + i) for i in range(length)]
+
+    letters = [letter for letter in string.ascii_uppercase if letter != "X"]
+    attempts = 0
+    while letters and len(occupied) < density * size * size and attempts < 100 * size * size:
+        attempts += 1
+        length = rng.choice((2, 2, 3))
+        horizontal = rng.random() < 0.5
+        if horizontal:
+            x, y = rng.randrange(size - length + 1), rng.randrange(size)
+            if y == exit_row:
+                continue  # keep the exit row free of other horizontal vehicles
+        else:
+            x, y = rng.randrange(size), rng.randrange(size - length + 1)
+        squares = cells(x, y, length, horizontal)
+        if occupied.isdisjoint(squares):
+            vehicles[letters.pop(0)] = [x, y, length, horizontal]
+            occupied.update(squares)
+
+    def score():
+        x = vehicles["X"][0]
+        return len({name for name, (cx, cy, length, horizontal) in vehicles.items()
+                    if name != "X" and not horizontal and cx > x + 1 and cy <= exit_row < cy + length}), -x
+
+    names = sorted(vehicles)
+    best, best_score = None, None
+    steps = 0
+    total = 50 * size * size if moves is None else moves
+    # every move can be undone, so all the states of the scrambling are solvable
+    while steps < total:
+        vehicle = vehicles[rng.choice(names)]
+        x, y, length, horizontal = vehicle
+        step = rng.choice((-1, 1))
+        if horizontal:
+            target = (x - 1, y) if step < 0 else (x + length, y)
+            vacated = (x + length - 1, y) if step < 0 else (x, y)
+        else:
+            target = (x, y - 1) if step < 0 else (x, y + length)
+            vacated = (x, y + length - 1) if step < 0 else (x, y)
+        if 0 <= target[0] < size and 0 <= target[1] < size and target not in occupied:
+            vehicle[0 if horizontal else 1] += step
+            occupied.remove(vacated)
+            occupied.add(target)
+            steps += 1
+            if vehicles["X"][0] < size - 2 and (best_score is None or score() > best_score):
+                best = {name: list(vehicle) for name, vehicle in vehicles.items()}
+                best_score = score()
+    if best is not None:
+        vehicles = best
+
+    grid = [["."] * size for _ in range(size)]
+    for name, (x, y, length, horizontal) in vehicles.items():
+        for cx, cy in cells(x, y, length, horizontal):
+            grid[cy][cx] = name
+    return ["".join(row) for row in grid], len(vehicles) - 1
+
+
+def graph_levels(gp):
+    # returns the number of levels of the graph of gp beyond the initial one (the levels of budget.Budget),
+    # the number both benchmarks report
+    return len(gp.graph) - 1 if gp.graph else 0
+
+
+def solve(compiled, timeout):
+    """
+    Runs GraphPlan on the compiled board with a time limit, returns the GraphPlan, the plan and the status,
+    the times of the run are in the stats of the GraphPlan (see planning/stats.py)
+    """
+    gp = GraphPlan(compiled, None, stats=PlanStats())
+    plan = gp.graph_plan(time_limit=timeout)
+    if isinstance(plan, BudgetExhausted):
+        return gp, None, "timeout"
+    return gp, plan, "solved" if plan is not None else "no plan"
+
+
+def measure(size, seed, timeout, density, memory=True):
+    """
+    Returns the row of the results of the board generated for size and seed (see FIELDS)
+    """
+    rows, n_vehicles = generate_board(size, seed, density)
+    compiled = compile_board(rows, size, size)
+    gp, plan, status = solve(compiled, timeout)
+    totals = gp.stats.totals()
+    result = {
+        "size": size,
+        "seed": seed,
+        "vehicles": n_vehicles,
+        "propositions": len(compiled.propositions),
+        "actions": len(compiled.actions),
+        "status": status,
+        "levels": graph_levels(gp),
+        "plan_actions": len([act for act in plan if not act.is_noop()]) if plan is not None else "",
+        "expansion_s": "%.4f" % totals["expansion_s"],
+        "extraction_s": "%.4f" % totals["extraction_s"],
+        "peak_kb": "",
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            solve(compiled, timeout)
+            result["peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GraphPlan on generated boards of growing size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="sizes N of the N x N boards")
+    parser.add_argument("--boards", type=int, default=3, help="number of boards per size (seeds 0 to K - 1)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="time limit per board, in seconds")
+    parser.add_argument("--density", type=float, default=0.6, help="fraction of the cells occupied by vehicles")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory run")
+    parser.add_argument("--csv", help="also write the results to this CSV file")
+    args = parser.parse_args()
+
+    results = []
+    print("%4s %4s %8s %6s %7s %8s %6s %6s %10s %10s %10s" % (
+        "size", "seed", "vehicles", "props", "actions", "status", "levels", "plan", "expand_s", "extract_s", "peak_kb"))
+    for size in args.sizes:
+        for seed in range(args.boards):
+            result = measure(size, seed, args.timeout, args.density, not args.no_memory)
+            results.append(result)
+            print("%4d %4d %8d %6d %7d %8s %6d %6s %10s %10s %10s" % tuple(result[field] for field in FIELDS))
+            sys.stdout.flush()
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+
+
+if __name__ == "__main__":
+    main()
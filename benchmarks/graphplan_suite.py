@@ -0,0 +1,211 @@
+"""
+Benchmark suite of GraphPlan with regression detection: solves every board of the boards folder and
+generated larger boards (see board_scaling.generate_board), several times each, and reports per board
+the median compile, expansion and extraction times (see planning/stats.py), the number of levels
+and the length of the plan.
+
+The results can be stored as a baseline, and later runs are compared with it: a board is reported when
+one of its times is slower than the baseline by more than the threshold (and by more than the noise floor),
+when it times out while the baseline solved it, or when its plan length changed; a board that times out
+in both is only compared on the levels it reached. The exit status is 1 when a regression is reported.
+Times are only comparable on the same machine, so the baseline is a local file (.cache/graphplan_baseline.json
+by default, not under version control) that is measured again with --update-baseline before a change.
+The boards of SLOW_BOARDS, that are not solved within the default time limit, are left out of the suite
+unless they are named with --boards.
+
+Usage: python3 benchmarks/graphplan_suite.py [--boards NAME ...] [--sizes N ...] [--repeat R] [--timeout S]
+                                             [--baseline FILE] [--update-baseline] [--threshold T]
+e.g. python3 benchmarks/graphplan_suite.py --update-baseline, and then after a change
+     python3 benchmarks/graphplan_suite.py
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.board_scaling import generate_board, graph_levels
+from planning.budget import BudgetExhausted
+from planning.graph_plan import GraphPlan
+from planning.rushhour import compile_board, read_board
+from planning.stats import PlanStats
+
+BOARDS_DIR = os.path.join(ROOT, "boards")
+BASELINE = os.path.join(ROOT, ".cache", "graphplan_baseline.json")
+SLOW_BOARDS = ("11", "39", "40")  # the boards of the boards folder that time out, only run when named
+DEFAULT_SIZES = [7, 8]
+TIMES = ("compile_s", "expand_s", "extract_s", "total_s")
+NOISE_FLOOR = 0.005  # slowdowns below that many seconds are never reported
+
+
+def machine():
+    # returns a description of the machine and the Python the times are measured with, stored in the baseline
+    processor = platform.processor() or platform.machine()
+    return "%s, %s, Python %s" % (platform.platform(), processor, platform.python_version())
+
+
+def suite_boards(names, sizes):
+    """
+    Returns the (name, rows, size) of the boards of the suite: the boards of the boards folder
+    (all of them but SLOW_BOARDS when names is None) followed by one generated board per size
+    """
+    if names is None:
+        names = sorted(os.path.basename(path)[:-4] for path in glob.glob(os.path.join(BOARDS_DIR, "*.txt")))
+        names = [name for name in names if name not in SLOW_BOARDS]
+    boards = []
+    for name in names:
+        with open(os.path.join(BOARDS_DIR, name + ".txt")) as f:
+            rows, height, width = read_board(f.read().splitlines())
+        boards.append((name, rows, height))
+    for size in sizes:
+        rows, _ = generate_board(size, 0)
+        boards.append(("generated_%dx%d" % (size, size), rows, size))
+    return boards
+
+
+def run_once(rows, size, timeout):
+    """
+    Compiles and solves the board once with a time limit (the compilation is not interrupted,
+    the search gets what is left of the limit), returns the compile, expansion and extraction times,
+    the status, the levels and the plan length
+    """
+    stats = PlanStats()
+    start = time.perf_counter()
+    compiled = compile_board(rows, size, size)
+    compile_s = time.perf_counter() - start
+    gp = GraphPlan(compiled, None, stats=stats)
+    plan = gp.graph_plan(time_limit=max(timeout - compile_s, 0.0))
+    if isinstance(plan, BudgetExhausted):
+        plan, status = None, "timeout"
+    else:
+        status = "solved" if plan is not None else "no plan"
+    totals = stats.totals()
+    return {
+        "compile_s": compile_s,
+        "expand_s": totals["expansion_s"],
+        "extract_s": totals["extraction_s"],
+        "total_s": time.perf_counter() - start,
+        "status": status,
+        "levels": graph_levels(gp),
+        "plan_actions": len([act for act in plan if not act.is_noop()]) if plan is not None else None,
+    }
+
+
+def measure(rows, size, repeat, timeout):
+    """
+    Returns the median times of repeat runs of the board, with the status, levels and plan length of the last
+    run (a board that times out is not run again)
+    """
+    runs = []
+    for _ in range(repeat):
+        runs.append(run_once(rows, size, timeout))
+        if runs[-1]["status"] == "timeout":
+            break
+    result = {name: statistics.median(run[name] for run in runs) for name in TIMES}
+    result.update((name, runs[-1][name]) for name in ("status", "levels", "plan_actions"))
+    result["runs"] = len(runs)
+    return result
+
+
+def compare(name, result, baseline, threshold):
+    """
+    Returns the regressions of the result of a board with respect to its baseline, as messages
+    """
+    if baseline is None:
+        return []
+    messages = []
+    if result["status"] != baseline["status"]:
+        if result["status"] == "timeout" or baseline["status"] == "solved":
+            messages.append("%s: %s instead of %s" % (name, result["status"], baseline["status"]))
+        return messages
+    if result["plan_actions"] != baseline["plan_actions"]:
+        messages.append(
+            "%s: plan of %s actions instead of %s" % (name, result["plan_actions"], baseline["plan_actions"])
+        )
+    if result["status"] == "timeout":
+        # the times of a board that times out are the limit, only the levels it reached tell something
+        if result["levels"] < baseline["levels"]:
+            messages.append("%s: timeout at level %s instead of %s" % (name, result["levels"], baseline["levels"]))
+        return messages
+    for time_name in TIMES:
+        new, old = result[time_name], baseline[time_name]
+        if new > old * (1 + threshold) and new - old > NOISE_FLOOR:
+            slowdown = "+%.0f%%" % (100 * (new / old - 1)) if old > 0 else "was 0"
+            messages.append("%s: %s %.4f s instead of %.4f s (%s)" % (name, time_name, new, old, slowdown))
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GraphPlan benchmark suite with regression detection")
+    parser.add_argument(
+        "--boards", nargs="+", help="names of boards of the boards folder (all of them but SLOW_BOARDS by default)"
+    )
+    parser.add_argument("--sizes", type=int, nargs="*", default=DEFAULT_SIZES, help="sizes of the generated boards")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs per board, the median is kept")
+    parser.add_argument("--timeout", type=float, default=30.0, help="time limit per run, in seconds")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline file to compare with (or to update)")
+    parser.add_argument("--update-baseline", action="store_true", help="store the results as the baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="relative slowdown reported as a regression (0.25 is 25%%)"
+    )
+    args = parser.parse_args()
+
+    baselines = dict()
+    if not args.update_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            baselines = baseline["boards"]
+            if baseline.get("machine") != machine():
+                print(
+                    "Warning: the baseline was measured on another machine (%s), its times are not comparable"
+                    % baseline.get("machine", "unknown")
+                )
+        else:
+            print("No baseline in %s, run with --update-baseline first" % args.baseline)
+
+    results = dict()
+    regressions = []
+    print("%-20s %8s %6s %6s %10s %10s %10s %10s" % (
+        "board", "status", "levels", "plan", "compile_s", "expand_s", "extract_s", "total_s"))
+    for name, rows, size in suite_boards(args.boards, args.sizes):
+        result = measure(rows, size, args.repeat, args.timeout)
+        results[name] = result
+        print("%-20s %8s %6s %6s %10.4f %10.4f %10.4f %10.4f" % (
+            name,
+            result["status"],
+            result["levels"],
+            result["plan_actions"],
+            result["compile_s"],
+            result["expand_s"],
+            result["extract_s"],
+            result["total_s"],
+        ))
+        sys.stdout.flush()
+        regressions.extend(compare(name, result, baselines.get(name), args.threshold))
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {"machine": machine(), "repeat": args.repeat, "timeout": args.timeout, "boards": results}, f, indent=2
+            )
+        print("Baseline written to %s" % args.baseline)
+    elif baselines:
+        if regressions:
+            print("\n%d regression(s) with respect to %s:" % (len(regressions), args.baseline))
+            for message in regressions:
+                print("  " + message)
+            sys.exit(1)
+        print("\nNo regression with respect to %s" % args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Memory benchmark of the plan graph: expands the graph of each board level by level
+and reports the bytes retained by every level, measured with tracemalloc.
+The boards are compiled like graphplan.py does (see rushhour.compile_board).
+
+Usage: python3 benchmarks/memory_per_level.py [--levels N] [--max-steps K] [--encoding ends|compact] [board ...]
+where a board is the name of a board of the boards folder,
+e.g. python3 benchmarks/memory_per_level.py --levels 20 --encoding compact 2 21
+"""
+
+import argparse
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from planning.graph_plan import GraphPlan
+from planning.rushhour import ENCODINGS, compile_board, read_board
+
+BOARDS_DIR = os.path.join(ROOT, "boards")
+DEFAULT_BOARDS = ["sample1", "1", "2", "21"]
+
+
+def measure(board, levels, max_steps=1, encoding="ends"):
+    """
+    Returns the list of the bytes retained by each level of the graph of board,
+    starting with the first level (the initial state)
+    """
+    with open(os.path.join(BOARDS_DIR, board + ".txt")) as f:
+        rows, height, width = read_board(f.read().splitlines())
+    gp = GraphPlan(compile_board(rows, height, width, max_steps=max_steps, encoding=encoding), None)
+    tracemalloc.start()
+    try:
+        previous = tracemalloc.get_traced_memory()[0]
+        gp.init_graph()
+        sizes = []
+        for level in range(levels + 1):
+            if level > 0:
+                gp.expand_graph()
+            current = tracemalloc.get_traced_memory()[0]
+            sizes.append(current - previous)
+            previous = current
+    finally:
+        tracemalloc.stop()
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory retained by each level of the plan graph")
+    parser.add_argument("boards", nargs="*", default=DEFAULT_BOARDS, help="names of boards of the boards folder")
+    parser.add_argument("--levels", type=int, default=30, help="number of levels to expand")
+    parser.add_argument("--max-steps", type=int, default=1, help="longest slide of a car in a single move action")
+    parser.add_argument("--encoding", choices=ENCODINGS, default="ends", help="encoding of the positions of the cars")
+    args = parser.parse_args()
+
+    print("%-16s %6s %12s %12s" % ("board", "level", "bytes", "total"))
+    for board in args.boards:
+        total = 0
+        sizes = measure(board, args.levels, args.max_steps, args.encoding)
+        for level, size in enumerate(sizes):
+            total += size
+            print("%-16s %6d %12d %12d" % (board, level, size, total))
+        print("%-16s %6s %12d %12d" % (board, "mean", total // len(sizes), total))
+
+
+if __name__ == "__main__":
+    main()
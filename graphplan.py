@@ -1,46 +1,190 @@
-import sys
-from planning.graph_plan import GraphPlan, parse_solution
+import argparse
+import os
+from planning.budget import BudgetExhausted
+from planning.checkpoint import load_checkpoint
+from planning.compiled_domain import board_key
+from planning.graph_plan import EXTRACTION_MODES, GraphPlan, parse_solution
+from planning.memory import MemoryTracker
+from planning.stats import PlanStats
 from planning.rushhour import (
+    ENCODINGS,
     parse_vehicle_list,
+    read_board,
+    relevant_vehicles,
     create_problem_file,
     create_domain_file,
+    compile_board,
 )
 import time
 
+CACHE_DIR = ".cache/compiled_domains"  # where the compiled boards are kept (see rushhour.compile_board)
 
-def main(board):
+
+def positive_int(text):
+    # the argparse type of --max-steps
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError("%s is not a positive integer" % text)
+    return value
+
+
+def main(
+    board,
+    write_files=False,
+    cache_dir=CACHE_DIR,
+    checkpoint=None,
+    max_steps=1,
+    encoding="ends",
+    stats_file=None,
+    trace_file=None,
+    time_limit=None,
+    max_levels=None,
+    max_nodes=None,
+    max_memory=None,
+    memory_file=None,
+    extraction=None,
+):
     board_filename = f"boards/{board}.txt"
     domain_filename = f"planning/gp_problem_domain/{board}_domain.txt"
     problem_filename = f"planning/gp_problem_domain/{board}_problem.txt"
 
     with open(board_filename, "r") as file:
-        content = file.read().splitlines()
-
-    main_vehicle, horizontal_vehicles, vertical_vehicles, empty_squares = parse_vehicle_list(content[1:])
-    create_domain_file(domain_filename, main_vehicle, horizontal_vehicles, vertical_vehicles)
-    create_problem_file(
-        problem_filename,
-        main_vehicle,
-        horizontal_vehicles,
-        vertical_vehicles,
-        empty_squares,
-    )
+        rows, height, width = read_board(file.read().splitlines())
+    options = dict() if extraction is None else {"extraction": extraction}
+    # a resumed run keeps the extraction mode of the checkpoint unless one is given
+    source = {
+        "board": board_filename,
+        "problem": board_key(rows, height, width, max_steps, encoding),
+        "max_steps": max_steps,
+        "encoding": encoding,
+    }
+    # what the run solves, a checkpoint saved for another board or other options is not resumed
+    stats = PlanStats() if stats_file is not None or trace_file is not None else None
+    memory = None
+    if max_memory is not None or memory_file is not None:
+        memory = MemoryTracker(None if max_memory is None else int(max_memory * 2**20))
 
-    gp = GraphPlan(domain_filename, problem_filename)
+    if checkpoint is not None and os.path.exists(checkpoint):
+        # continue the run saved in the checkpoint
+        try:
+            gp = load_checkpoint(checkpoint, stats=stats, memory=memory, source=source, **options)
+        except ValueError as error:
+            raise SystemExit("Cannot resume: %s, remove the file or use another one" % error)
+        print("Resuming from level %d" % (len(gp.graph) - 1))
+    elif write_files:
+        main_vehicle, horizontal_vehicles, vertical_vehicles, empty_squares = parse_vehicle_list(rows)
+        horizontal_vehicles, vertical_vehicles = relevant_vehicles(main_vehicle, horizontal_vehicles, vertical_vehicles)
+        create_domain_file(
+            domain_filename, main_vehicle, horizontal_vehicles, vertical_vehicles, height, width, max_steps, encoding
+        )
+        create_problem_file(
+            problem_filename,
+            main_vehicle,
+            horizontal_vehicles,
+            vertical_vehicles,
+            empty_squares,
+            height,
+            width,
+            encoding,
+        )
+        gp = GraphPlan(domain_filename, problem_filename, stats=stats, memory=memory, source=source, **options)
+    else:
+        # the domain and the problem are built in memory, or loaded from the cache
+        compiled = compile_board(rows, height, width, cache_dir=cache_dir, max_steps=max_steps, encoding=encoding)
+        gp = GraphPlan(compiled, None, stats=stats, memory=memory, source=source, **options)
     start = time.perf_counter()
-    plan = gp.graph_plan()
+    plan = gp.graph_plan(
+        resume=checkpoint is not None,
+        checkpoint=checkpoint,
+        time_limit=time_limit,
+        max_levels=max_levels,
+        max_nodes=max_nodes,
+    )
     elapsed = time.perf_counter() - start
-    if plan is not None:
+    if isinstance(plan, BudgetExhausted):
+        print("Stopped: %s" % plan)
+    elif plan is not None:
         print("Plan found with %d actions in %.6f seconds" % (len([act for act in plan if not act.is_noop()]), elapsed))
         solution = parse_solution(plan)
         print(solution)
     else:
         print("Could not find a plan in %.6f seconds" % elapsed)
+    if stats is not None:
+        totals = stats.totals()
+        print("Expansion %.6f seconds, extraction %.6f seconds" % (totals["expansion_s"], totals["extraction_s"]))
+        if stats_file is not None:
+            stats.to_json(stats_file)
+        if trace_file is not None:
+            stats.to_chrome_trace(trace_file)
+    if memory is not None:
+        print("Peak memory %.1f MB" % (memory.peak / 2**20))
+        for shed in memory.sheds:
+            freed = shed["freed_bytes"] / 2**20
+            print("Dropped %d %s entries, %.1f MB freed" % (shed["entries"], shed["cache"], freed))
+        if memory_file is not None:
+            memory.to_json(memory_file)
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python3 graphplan.py <board>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Solves a Rush Hour board with GraphPlan")
+    parser.add_argument("board", help="name of a board of the boards folder")
+    parser.add_argument(
+        "--write-files",
+        action="store_true",
+        help="write the domain and the problem to planning/gp_problem_domain and solve from the files",
+    )
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="directory of the compiled boards cache")
+    parser.add_argument("--no-cache", action="store_true", help="compile the board without the cache")
+    parser.add_argument(
+        "--checkpoint",
+        help="save the expanded graph to this file while solving, and resume from it when it exists "
+        "(only resume files you trust, a tampered checkpoint can make the run wrong)",
+    )
+    parser.add_argument(
+        "--max-steps",
+        type=positive_int,
+        default=1,
+        help="longest slide of a car in a single move action (1 moves cars one square at a time)",
+    )
+    parser.add_argument(
+        "--encoding",
+        choices=ENCODINGS,
+        default="ends",
+        help="encoding of the positions of the cars (see rushhour.ENCODINGS)",
+    )
+    parser.add_argument(
+        "--extraction",
+        choices=EXTRACTION_MODES,
+        help="how plans are extracted from the graph, first by default (see graph_plan.EXTRACTION_MODES)",
+    )
+    parser.add_argument("--stats", help="write the statistics of the levels and of the extractions to this JSON file")
+    parser.add_argument("--trace", help="write the expansion and extraction timeline to this Chrome trace file")
+    parser.add_argument("--time-limit", type=float, help="stop the run after this many seconds")
+    parser.add_argument("--max-levels", type=int, help="stop the run instead of expanding the graph beyond this level")
+    parser.add_argument("--max-nodes", type=int, help="stop the run after this many nodes of the backward search")
+    parser.add_argument(
+        "--max-memory",
+        type=float,
+        help="limit of the memory of the run in MB, the search caches are dropped near it (see planning/memory.py)",
+    )
+    parser.add_argument(
+        "--memory", help="write the memory allocated by the levels and the extractions to this JSON file"
+    )
+    args = parser.parse_args()
 
-    main(sys.argv[1])
+    main(
+        args.board,
+        args.write_files,
+        None if args.no_cache else args.cache_dir,
+        args.checkpoint,
+        args.max_steps,
+        args.encoding,
+        args.stats,
+        args.trace,
+        args.time_limit,
+        args.max_levels,
+        args.max_nodes,
+        args.max_memory,
+        args.memory,
+        args.extraction,
+    )
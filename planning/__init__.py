@@ -1,10 +1,20 @@
 from .graph_plan import GraphPlan, parse_solution
-from .rushhour import parse_vehicle_list, create_problem_file, create_domain_file
+from .rushhour import (
+    parse_vehicle_list,
+    read_board,
+    relevant_vehicles,
+    create_problem_file,
+    create_domain_file,
+    create_domain_and_problem,
+)
 
 __all__ = [
     "GraphPlan",
     "parse_solution",
     "parse_vehicle_list",
+    "read_board",
+    "relevant_vehicles",
     "create_problem_file",
     "create_domain_file",
+    "create_domain_and_problem",
 ]
@@ -1,12 +1,19 @@
+from planning.util import to_mask
+
+
 class Action(object):
     """
     The action class is used to define operators.
     Each action has a list of preconditions, an "add list" of positive effects,
     a "delete list" for negative effects, and the name of the action.
     Two actions are considered equal if they have the same name.
+    Each action also has a dense integer index, and its pre/add/delete lists
+    are compiled into int bitsets over the proposition indices (see update_masks).
     """
 
-    def __init__(self, name, pre, add, delete, is_noop=False):
+    __slots__ = ("pre", "add", "delete", "name", "noOp", "index", "pre_mask", "add_mask", "del_mask")
+
+    def __init__(self, name, pre, add, delete, is_noop=False, index=None):
         """
         Constructor
         """
@@ -17,6 +24,19 @@ class Action(object):
         self.delete = delete  # list of the propositions that will be deleted after applying the action
         self.name = name  # the name of the action as string
         self.noOp = is_noop  # true if the action is a noOp
+        self.index = index  # the dense integer id of the action (set by the parser)
+        self.pre_mask = 0  # bitset of the precondition propositions
+        self.add_mask = 0  # bitset of the add list
+        self.del_mask = 0  # bitset of the delete list
+
+    def update_masks(self):
+        """
+        Compiles the pre/add/delete lists into bitsets,
+        must be called once all the propositions of the action are interned
+        """
+        self.pre_mask = to_mask(self.pre)
+        self.add_mask = to_mask(self.add)
+        self.del_mask = to_mask(self.delete)
 
     def get_pre(self):
         return self.pre
@@ -30,27 +50,32 @@ class Action(object):
     def get_name(self):
         return self.name
 
+    def get_index(self):
+        return self.index
+
     def is_pre_cond(self, prop):
-        return prop in self.pre
+        return (self.pre_mask >> prop.index) & 1 == 1
 
     def is_pos_effect(self, prop):
         """
         True if the proposition prop is a positive effect of the action
         """
-        return prop in self.add
+        return (self.add_mask >> prop.index) & 1 == 1
 
     def is_neg_effect(self, prop):
         """
         Returns true if the proposition prop is a negative effect of the action
         """
-        return prop in self.delete
+        return (self.del_mask >> prop.index) & 1 == 1
 
     def all_preconds_in_list(self, propositions):
         """
         Returns true if all the precondition of the action
         are in the propositions list / set
-        propositions must be iterable
+        propositions must be iterable, or an int bitset of propositions
         """
+        if isinstance(propositions, int):
+            return self.pre_mask & ~propositions == 0
         for pre in self.pre:
             if pre not in propositions:
                 return False
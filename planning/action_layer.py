@@ -1,10 +1,11 @@
-from planning.util import Pair
+from planning.util import Pair, MutexSet
 
 
 class ActionLayer(object):
     """
     A class for an ActionLayer in a level of the graph.
     The layer contains a set of actions (action objects) and a set of mutex actions (Pair objects)
+    The mutex actions are kept as a bit-packed matrix over the action indices (see util.MutexSet)
     """
 
     def __init__(self):
@@ -12,17 +13,62 @@ class ActionLayer(object):
         Constructor
         """
         self.actions = set()  # set of all the actions in the layer
-        self.mutexActions = set()  # set of pairs of action that are mutex in the layer
+        self.mask = 0  # bitset of the indices of all the actions in the layer
+        self.pre_index = dict()  # proposition index -> bitset of the actions in the layer that require it
+        self.add_index = dict()  # proposition index -> bitset of the actions in the layer that add it
+        self.mutexActions = MutexSet()  # set of pairs of action that are mutex in the layer
+        self.shared = False  # true while actions and pre_index are shared with another layer
 
     def add_action(self, act):  # adds the action act to the actions set
+        self.unshare()
         self.actions.add(act)
+        bit = 1 << act.index
+        self.mask |= bit
+        for prop in act.get_pre():
+            self.pre_index[prop.index] = self.pre_index.get(prop.index, 0) | bit
+        for prop in act.get_add():
+            self.add_index[prop.index] = self.add_index.get(prop.index, 0) | bit
+
+    def share_actions_of(self, other):
+        """
+        Makes the layer contain the actions of the action layer other,
+        the structures are shared with other until this layer is modified (copy on write)
+        """
+        self.actions = other.actions
+        self.mask = other.mask
+        self.pre_index = other.pre_index
+        self.add_index = other.add_index
+        self.shared = True
+
+    def unshare(self):  # copies the shared structures before they are modified
+        if self.shared:
+            self.actions = set(self.actions)
+            self.pre_index = dict(self.pre_index)
+            self.add_index = dict(self.add_index)
+            self.shared = False
 
     def remove_actions(self, act):  # removes the action act to the actions set
+        self.unshare()
         self.actions.remove(act)
+        bit = 1 << act.index
+        self.mask &= ~bit
+        for prop in act.get_pre():
+            self.pre_index[prop.index] &= ~bit
+        for prop in act.get_add():
+            self.add_index[prop.index] &= ~bit
 
     def get_actions(self):  # returns the actions set
         return self.actions
 
+    def get_mask(self):  # returns the actions bitset
+        return self.mask
+
+    def get_requirers(self, prop):  # returns the bitset of the actions that have prop as a precondition
+        return self.pre_index.get(prop.index, 0)
+
+    def get_producers(self, prop):  # returns the bitset of the actions that have prop in their add list
+        return self.add_index.get(prop.index, 0)
+
     def get_mutex_actions(self):  # returns the mutex actions set
         return self.mutexActions
 
@@ -41,10 +87,7 @@ class ActionLayer(object):
         """
         Returns true if at least one of the actions in this layer has the proposition prop in its add list
         """
-        for act in self.actions:
-            if prop in act.get_add():
-                return True
-        return False
+        return self.get_producers(prop) != 0
 
     def __eq__(self, other):
         return isinstance(other, self.__class__) and self.__dict__ == other.__dict__
@@ -0,0 +1,127 @@
+"""
+Budgets of a GraphPlan run: a time limit, a maximal number of levels of the graph, a maximal number of
+nodes of the backward search (calls of GraphPlan.gp_search), a cancellation token that another thread
+can set, and a memory limit (see memory.MemoryTracker). The expansion checks the budget between its
+steps and the search at every node; once the budget runs out, GraphPlan.graph_plan returns
+a BudgetExhausted result instead of a plan.
+"""
+
+import threading
+import time
+
+TIME_CHECK_PERIOD = 64  # the search checks the clock and the token once every that many nodes
+
+
+class CancellationToken(object):
+    """
+    A flag that cancels the runs that check it, it can be set from any thread
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.event = threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    def is_cancelled(self):
+        return self.event.is_set()
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised by Budget when the budget runs out, reason is one of "time", "levels", "nodes", "memory" and "cancelled"
+    """
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class BudgetExhausted(object):
+    """
+    The result of a run whose budget ran out: the reason (see BudgetExceeded), the last level
+    of the graph, the number of search nodes and the seconds spent, and the statistics gathered
+    so far (a stats.PlanStats, or None when the run had none)
+    """
+
+    def __init__(self, reason, level, nodes, elapsed, stats=None):
+        """
+        Constructor
+        """
+        self.reason = reason
+        self.level = level
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.stats = stats
+
+    def __str__(self):
+        return "budget exhausted (%s) at level %d after %d search nodes and %.3f seconds" % (
+            self.reason,
+            self.level,
+            self.nodes,
+            self.elapsed,
+        )
+
+
+class Budget(object):
+    """
+    The limits of a run, None for no limit (see the module documentation).
+    shed is called when the memory gets near the limit of memory, before the limit is checked
+    """
+
+    def __init__(self, time_limit=None, max_levels=None, max_nodes=None, cancel=None, memory=None, shed=None):
+        """
+        Constructor
+        """
+        self.time_limit = time_limit  # seconds
+        self.max_levels = max_levels  # levels of the graph, the initial one excluded
+        self.max_nodes = max_nodes  # nodes of the backward search
+        self.cancel = cancel  # a CancellationToken
+        self.memory = memory  # a memory.MemoryTracker
+        self.shed = shed
+        self.start = time.perf_counter()
+        self.nodes = 0
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def check(self):
+        """
+        Raises BudgetExceeded if the run was cancelled, is out of time or is above the limit of memory
+        """
+        if self.cancel is not None and self.cancel.is_cancelled():
+            raise BudgetExceeded("cancelled")
+        if self.time_limit is not None and self.elapsed() > self.time_limit:
+            raise BudgetExceeded("time")
+        if self.memory is not None and self.memory.near_limit():
+            if self.shed is not None:
+                self.shed()
+            if self.memory.over_limit():
+                raise BudgetExceeded("memory")
+
+    def check_level(self, level):
+        """
+        Raises BudgetExceeded if the graph may not be expanded to level
+        """
+        self.check()
+        if self.max_levels is not None and level > self.max_levels:
+            raise BudgetExceeded("levels")
+
+    def charge_node(self):
+        """
+        Counts a node of the search, raises BudgetExceeded when the budget runs out
+        """
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise BudgetExceeded("nodes")
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_PERIOD == 0:
+            self.check()
+
+
+def check_budget(budget):
+    # checks budget (see Budget.check), does nothing when budget is None
+    if budget is not None:
+        budget.check()
@@ -0,0 +1,178 @@
+"""
+Checkpoints of a GraphPlan run: the levels of the planning graph expanded so far, with the nogoods
+and the solved goal sets of every level, so that a run that was interrupted or gave up can be resumed
+(see GraphPlan.graph_plan) without expanding the graph again.
+
+The file is little endian, it starts with a header (see HEADER), followed by
+- the compiled problem (see compiled_domain.CompiledDomain.to_bytes),
+- the zlib compressed pickle of the state of the run.
+The actions, the noOps and the propositions are pickled as their indices (see StatePickler),
+so the state only holds the layers, the mutex bitsets, the nogoods and the plans found,
+and its objects are the ones of the compiled problem once loaded.
+
+A checkpoint is only unpickled with the classes of the state (see SAFE_CLASSES), so a crafted file
+cannot run code when it is loaded, but a tampered one can still make the resumed run wrong or fail:
+only resume checkpoints that you or a run you trust wrote.
+"""
+
+import io
+import pickle
+import struct
+import zlib
+
+from planning.action import Action
+from planning.compiled_domain import CompiledDomain, write_atomically
+from planning.proposition import Proposition
+
+MAGIC = b"GPCK"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<4sIQQ")
+# magic, format version, size of the compiled problem, size of the compressed state
+
+STATE_FIELDS = ("graph", "no_goods", "solved", "first_level", "fixed_level", "size_no_good")
+# the attributes of GraphPlan that make up the state of a run
+OPTION_FIELDS = ("mutex_mode", "max_no_goods", "extraction", "source")
+# the options of the run and what its problem was built from, a resumed run uses the same ones
+SAFE_CLASSES = {
+    ("builtins", "set"),
+    ("builtins", "frozenset"),
+    ("collections", "OrderedDict"),
+    ("planning.action_layer", "ActionLayer"),
+    ("planning.no_good_table", "NoGoodTable"),
+    ("planning.plan_graph_level", "PlanGraphLevel"),
+    ("planning.proposition_layer", "PropositionLayer"),
+    ("planning.util", "MutexSet"),
+    ("planning.util", "Pair"),
+}
+# the (module, name) of the classes a checkpoint holds, the only ones it may load (see CheckpointUnpickler)
+
+
+class StatePickler(pickle.Pickler):
+    """
+    Pickles the actions, the noOps, the propositions, and the lists of all the actions
+    and of all the propositions of a GraphPlan as references to the compiled problem
+    """
+
+    def __init__(self, file, gp):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.gp = gp
+
+    def persistent_id(self, obj):
+        if obj is self.gp.actions:
+            return ("actions",)
+        if obj is self.gp.propositions:
+            return ("propositions",)
+        if isinstance(obj, Action):
+            if obj.is_noop():
+                return ("noop", obj.get_add()[0].index)
+            return ("action", obj.index)
+        if isinstance(obj, Proposition):
+            return ("proposition", obj.index)
+        return None
+
+
+class CheckpointUnpickler(pickle.Unpickler):
+    """
+    An unpickler that only loads the classes of SAFE_CLASSES, pickles that refer to any other
+    global (a function to call, say) raise pickle.UnpicklingError
+    """
+
+    def find_class(self, module, name):
+        if (module, name) not in SAFE_CLASSES:
+            raise pickle.UnpicklingError("%s.%s is not allowed in a checkpoint" % (module, name))
+        return super().find_class(module, name)
+
+
+class StateUnpickler(CheckpointUnpickler):
+    """
+    The inverse of StatePickler, resolves the references against the objects of a GraphPlan
+    """
+
+    def __init__(self, file, gp, propositions):
+        super().__init__(file)
+        self.gp = gp
+        self.all_propositions = propositions  # the propositions of the problem, by index
+
+    def persistent_load(self, pid):
+        kind = pid[0]
+        if kind == "actions":
+            return self.gp.actions
+        if kind == "propositions":
+            return self.gp.propositions
+        if kind == "noop":
+            return self.gp.noops[pid[1]]
+        if kind == "action":
+            return self.gp.actions[pid[1]]
+        if kind == "proposition":
+            return self.all_propositions[pid[1]]
+        raise pickle.UnpicklingError("unknown reference %r" % (pid,))
+
+
+def save_checkpoint(gp, path):
+    """
+    Writes the state of the run of the GraphPlan gp to path (atomically)
+    """
+    compiled = CompiledDomain(
+        gp.actions, gp.propositions, gp.initial_state, gp.goal, gp.interference, gp.static_mutex
+    )
+    domain = compiled.to_bytes()
+    buffer = io.BytesIO()
+    pickle.dump({name: getattr(gp, name) for name in OPTION_FIELDS}, buffer, pickle.HIGHEST_PROTOCOL)
+    StatePickler(buffer, gp).dump({name: getattr(gp, name) for name in STATE_FIELDS})
+    data = zlib.compress(buffer.getvalue())
+    write_atomically(path, HEADER.pack(MAGIC, FORMAT_VERSION, len(domain), len(data)) + domain + data)
+
+
+def source_differences(saved, source):
+    # returns the differences between the source of a saved run and the given one (see GraphPlan), as readable text
+    saved = saved or dict()
+    return ", ".join(
+        "%s %s instead of %s" % (key, saved.get(key), source.get(key))
+        for key in sorted(set(saved) | set(source))
+        if saved.get(key) != source.get(key)
+    )
+
+
+def load_checkpoint(path, **options):
+    """
+    Returns a GraphPlan with the state saved in path, call its graph_plan(resume=True) to continue the run.
+    The options max_no_goods and extraction default to the ones of the saved run, stats and memory record
+    the resumed run, the mutex mode is always the saved one since the saved mutexes depend on it.
+    source, when given, is what the resumed run solves (see GraphPlan), it must be the source of the saved run.
+    Raises ValueError if the file is not a checkpoint of the current format, was saved for another source
+    or holds anything but the state of a run (see CheckpointUnpickler)
+    """
+    from planning.graph_plan import GraphPlan
+
+    with open(path, "rb") as f:
+        content = f.read()
+    if len(content) < HEADER.size:
+        raise ValueError("%s is not a checkpoint" % path)
+    magic, version, domain_size, data_size = HEADER.unpack_from(content, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError("%s is not a checkpoint of version %d" % (path, FORMAT_VERSION))
+    if len(content) != HEADER.size + domain_size + data_size:
+        raise ValueError("%s is truncated" % path)
+    view = memoryview(content)
+    compiled = CompiledDomain.from_buffer(view[HEADER.size: HEADER.size + domain_size], path)
+    try:
+        stream = io.BytesIO(zlib.decompress(view[HEADER.size + domain_size:]))
+        saved = CheckpointUnpickler(stream).load()
+    except (zlib.error, pickle.UnpicklingError) as error:
+        raise ValueError("%s is not a valid checkpoint: %s" % (path, error))
+    if not isinstance(saved, dict) or set(saved) != set(OPTION_FIELDS):
+        raise ValueError("%s is not a valid checkpoint: unexpected options" % path)
+    source = options.get("source")
+    if source is not None and saved["source"] != source:
+        raise ValueError("%s was saved for another problem: %s" % (path, source_differences(saved["source"], source)))
+    saved.update((name, options[name]) for name in ("max_no_goods", "extraction", "stats", "memory") if name in options)
+    gp = GraphPlan(compiled, None, **saved)
+    try:
+        state = StateUnpickler(stream, gp, compiled.all_propositions()).load()
+    except pickle.UnpicklingError as error:
+        raise ValueError("%s is not a valid checkpoint: %s" % (path, error))
+    for name in STATE_FIELDS:
+        setattr(gp, name, state[name])
+    for level, table in enumerate(gp.no_goods):
+        table.max_size = None if level == gp.fixed_level else gp.max_no_goods
+    return gp
@@ -0,0 +1,351 @@
+"""
+Compiled planning problems: the parsed actions and propositions of a domain, the initial and goal
+states, the static interference table of the actions (see interference_table) and the static
+mutexes of the propositions (see static_mutex_table).
+A compiled problem can be saved to a compact binary file and loaded back without parsing the
+domain or recomputing the interference table, which is what the on-disk cache of
+rushhour.compile_board relies on.
+
+The file is little endian, it starts with a header (see HEADER), followed by
+- the names of the propositions and then of the actions, UTF-8 encoded and separated by newlines,
+- the number of propositions in the pre, add and delete lists of every action (uint32),
+- the indices of the propositions of all these lists, concatenated (uint32),
+- the indices of the propositions of the initial state and of the goal state (uint32),
+- the interference table, one bitset of (number of actions + 7) // 8 bytes per action,
+- the static mutex table, one bitset of (number of propositions of the domain + 7) // 8 bytes
+  per proposition of the domain.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections import defaultdict
+
+from planning.action import Action
+from planning.pgparser import PgParser
+from planning.proposition import Proposition
+from planning.pruning import useful_part
+from planning.util import iter_bits, to_mask
+
+MAGIC = b"GPCD"
+FORMAT_VERSION = 4
+HEADER = struct.Struct("<4sIIIIIIII")
+# magic, format version, number of propositions of the domain, number of propositions
+# (the ones of the problem that are not in the domain included), number of actions,
+# size of the initial state, size of the goal state, size of the names, number of list indices
+
+
+def interference_table(actions):
+    """
+    Returns the static interference table of the actions: the i-th bitset is the set of the
+    actions that are not independent of the action with index i (see graph_plan.independent_pair).
+    Actions are indexed by the propositions they delete, so only actions that
+    touch a common proposition are ever compared.
+    """
+    use_by = defaultdict(int)  # proposition -> actions that require or add it
+    del_by = defaultdict(int)  # proposition -> actions that delete it
+    for act in actions:
+        bit = 1 << act.index
+        for prop in act.get_pre() + act.get_add():
+            use_by[prop.index] |= bit
+        for prop in act.get_delete():
+            del_by[prop.index] |= bit
+
+    interference = [0] * len(actions)
+    for act in actions:
+        conflicts = 0
+        for prop in act.get_pre() + act.get_add():
+            conflicts |= del_by.get(prop.index, 0)
+        for prop in act.get_delete():
+            conflicts |= use_by.get(prop.index, 0)
+        interference[act.index] = conflicts & ~(1 << act.index)
+    return interference
+
+
+def static_mutex_table(propositions, groups):
+    """
+    Returns the static mutex table of the propositions given the invariant groups of the domain
+    (lists of propositions of which at most one holds in any reachable state, see PgParser.get_mutex_groups):
+    the i-th bitset is the set of the propositions that can never hold together with the proposition
+    with index i, so they are mutex in every level of the plan graph.
+    """
+    table = [0] * len(propositions)
+    for group in groups:
+        mask = to_mask(group)
+        for prop in group:
+            table[prop.index] |= mask
+    return [row & ~(1 << index) for index, row in enumerate(table)]
+
+
+def board_key(content, height, width, max_steps=1, encoding="ends"):
+    """
+    Returns the cache key of a board: a hash of the rows of the board, of its size,
+    of the longest slide of a move action and of the encoding of the domain
+    """
+    text = "%dx%d/%d/%s\n%s" % (height, width, max_steps, encoding, "\n".join(content))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def to_uint32(values):
+    # returns the little endian uint32 array of the values (the "I" type code is 4 bytes wide in CPython)
+    items = array("I", values)
+    if sys.byteorder == "big":
+        items.byteswap()
+    return items
+
+
+def from_uint32(buffer, offset, count):
+    # reads count little endian uint32 values at offset, returns them and the offset that follows
+    items = array("I")
+    items.frombytes(buffer[offset: offset + 4 * count])
+    if sys.byteorder == "big":
+        items.byteswap()
+    return items, offset + 4 * count
+
+
+class CompiledDomain(object):
+    """
+    A parsed planning problem with the static interference table of its actions.
+    GraphPlan accepts it in place of the domain and problem file names.
+    """
+
+    def __init__(self, actions, propositions, initial_state, goal, interference, static_mutex=None):
+        """
+        Constructor
+        """
+        self.actions = actions  # list of the actions, action i has the index i
+        self.propositions = propositions  # list of the propositions of the domain, proposition i has the index i
+        self.initial_state = initial_state  # list of the propositions of the initial state
+        self.goal = goal  # list of the propositions of the goal state
+        self.interference = interference  # the static interference table (see interference_table)
+        if static_mutex is None:
+            static_mutex = [0] * len(propositions)
+        self.static_mutex = static_mutex  # the static mutex table (see static_mutex_table)
+
+    @staticmethod
+    def compile(domain, problem, prune=True):
+        """
+        Parses the domain and the problem (file names or in memory, see PgParser),
+        and computes the interference table of the actions and the static mutex table of the propositions.
+        When prune is true, the propositions and the actions that no plan can use are dropped (see prune)
+        """
+        parser = PgParser(domain, problem)
+        actions, propositions = parser.parse_actions_and_propositions()
+        initial_state, goal = parser.parse_problem()
+        compiled = CompiledDomain(
+            actions,
+            propositions,
+            initial_state,
+            goal,
+            interference_table(actions),
+            static_mutex_table(propositions, parser.get_mutex_groups()),
+        )
+        return compiled.prune() if prune else compiled
+
+    def prune(self):
+        """
+        Returns the problem restricted to the propositions and the actions that are reachable from
+        the initial state and relevant to the goal (see pruning.py), with new dense indices.
+        The interference table is the one of the original actions, so two kept actions that
+        interfere through a dropped proposition are still mutex, and the planning graph of the
+        pruned problem is the one of the problem without the dropped propositions and actions
+        """
+        facts, actions = useful_part(self.actions, self.initial_state, self.goal)
+        propositions = []
+        extra = []
+        for prop in self.all_propositions():
+            if (facts >> prop.index) & 1:
+                (propositions if prop.index < len(self.propositions) else extra).append(prop)
+        by_index = dict()  # old index -> new proposition
+        for prop in propositions + extra:
+            by_index[prop.index] = Proposition(prop.name, len(by_index))
+
+        def kept(props):
+            return [by_index[prop.index] for prop in props if prop.index in by_index]
+
+        action_index = dict()  # old index -> new index
+        result = []
+        for act in actions:
+            action_index[act.index] = len(result)
+            new = Action(act.name, kept(act.get_pre()), kept(act.get_add()), kept(act.get_delete()), False, len(result))
+            new.update_masks()
+            for prop in new.get_add():
+                prop.add_producer(new)
+            result.append(new)
+        interference = []
+        for act in actions:
+            row = 0
+            for index in iter_bits(self.interference[act.index]):
+                if index in action_index:
+                    row |= 1 << action_index[index]
+            interference.append(row)
+        static_mutex = []
+        for prop in propositions:
+            row = 0
+            for index in iter_bits(self.static_mutex[prop.index]):
+                if index in by_index:
+                    row |= 1 << by_index[index].index
+            static_mutex.append(row)
+        return CompiledDomain(
+            result,
+            [by_index[prop.index] for prop in propositions],
+            kept(self.initial_state),
+            kept(self.goal),
+            interference,
+            static_mutex,
+        )
+
+    def all_propositions(self):
+        # returns the propositions of the domain followed by the ones that only appear in the problem
+        extra = dict()
+        for prop in self.initial_state + self.goal:
+            if prop.index >= len(self.propositions):
+                extra[prop.index] = prop
+        return self.propositions + [extra[index] for index in sorted(extra)]
+
+    def to_bytes(self):
+        """
+        Returns the compiled problem in the binary format of the module (see from_buffer)
+        """
+        propositions = self.all_propositions()
+        names = "\n".join([p.name for p in propositions] + [a.name for a in self.actions]).encode("utf-8")
+        counts = []
+        indices = []
+        for act in self.actions:
+            for props in (act.get_pre(), act.get_add(), act.get_delete()):
+                counts.append(len(props))
+                indices.extend(prop.index for prop in props)
+        row_bytes = (len(self.actions) + 7) // 8
+        header = HEADER.pack(
+            MAGIC,
+            FORMAT_VERSION,
+            len(self.propositions),
+            len(propositions),
+            len(self.actions),
+            len(self.initial_state),
+            len(self.goal),
+            len(names),
+            len(indices),
+        )
+        parts = [
+            header,
+            names,
+            to_uint32(counts).tobytes(),
+            to_uint32(indices).tobytes(),
+            to_uint32([p.index for p in self.initial_state + self.goal]).tobytes(),
+        ]
+        parts.extend(row.to_bytes(row_bytes, "little") for row in self.interference)
+        prop_bytes = (len(self.propositions) + 7) // 8
+        parts.extend(row.to_bytes(prop_bytes, "little") for row in self.static_mutex)
+        return b"".join(parts)
+
+    def save(self, path):
+        """
+        Writes the compiled problem to path (atomically: a partially written file is never visible)
+        """
+        write_atomically(path, self.to_bytes())
+
+    @staticmethod
+    def load(path):
+        """
+        Reads a compiled problem written by save, the file is memory mapped while it is read.
+        Raises ValueError if the file is not a compiled problem of the current format
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise ValueError("%s is not a compiled domain" % path)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                return CompiledDomain.from_buffer(buffer, path)
+
+    @staticmethod
+    def from_buffer(buffer, path):
+        (
+            magic,
+            version,
+            n_domain_props,
+            n_props,
+            n_actions,
+            n_init,
+            n_goal,
+            names_size,
+            n_indices,
+        ) = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("%s is not a compiled domain of version %d" % (path, FORMAT_VERSION))
+        row_bytes = (n_actions + 7) // 8
+        prop_bytes = (n_domain_props + 7) // 8
+        size = HEADER.size + names_size + 4 * (3 * n_actions + n_indices + n_init + n_goal)
+        if len(buffer) != size + n_actions * row_bytes + n_domain_props * prop_bytes:
+            raise ValueError("%s is truncated" % path)
+
+        offset = HEADER.size
+        names = bytes(buffer[offset: offset + names_size]).decode("utf-8").split("\n")
+        offset += names_size
+        counts, offset = from_uint32(buffer, offset, 3 * n_actions)
+        indices, offset = from_uint32(buffer, offset, n_indices)
+        states, offset = from_uint32(buffer, offset, n_init + n_goal)
+
+        propositions = [Proposition(names[i], i) for i in range(n_props)]
+        actions = []
+        position = 0
+        for i in range(n_actions):
+            lists = []
+            for count in counts[3 * i: 3 * i + 3]:
+                lists.append([propositions[index] for index in indices[position: position + count]])
+                position += count
+            act = Action(names[n_props + i], lists[0], lists[1], lists[2], False, i)
+            act.update_masks()
+            for prop in act.get_add():
+                prop.add_producer(act)
+            actions.append(act)
+        interference = [
+            int.from_bytes(buffer[offset + i * row_bytes: offset + (i + 1) * row_bytes], "little")
+            for i in range(n_actions)
+        ]
+        offset += n_actions * row_bytes
+        static_mutex = [
+            int.from_bytes(buffer[offset + i * prop_bytes: offset + (i + 1) * prop_bytes], "little")
+            for i in range(n_domain_props)
+        ]
+        initial_state = [propositions[index] for index in states[:n_init]]
+        goal = [propositions[index] for index in states[n_init:]]
+        return CompiledDomain(actions, propositions[:n_domain_props], initial_state, goal, interference, static_mutex)
+
+
+def write_atomically(path, data):
+    """
+    Writes the bytes data to path through a temporary file of the same directory,
+    so that a partially written file is never visible
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def load_or_compile(path, build):
+    """
+    Returns the compiled problem stored in path, or compiles the problem returned by build()
+    (a pair domain, problem, see PgParser) and stores it in path when the file is missing or invalid
+    """
+    try:
+        return CompiledDomain.load(path)
+    except (OSError, ValueError):
+        pass
+    compiled = CompiledDomain.compile(*build())
+    try:
+        compiled.save(path)
+    except OSError:
+        pass  # the cache is only an optimization
+    return compiled
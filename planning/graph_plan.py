@@ -1,8 +1,22 @@
 from planning.proposition_layer import PropositionLayer
 from planning.plan_graph_level import PlanGraphLevel
 from planning.action import Action
-from planning.pgparser import PgParser
-from planning.util import Pair
+from planning.budget import Budget, BudgetExceeded, BudgetExhausted
+from planning.checkpoint import save_checkpoint
+from planning.compiled_domain import CompiledDomain, interference_table
+from planning.memory import SHED_FLOOR, SHED_SHARE, measure
+from planning.no_good_table import NoGoodTable
+from planning.sat_extraction import GraphEncoding
+from planning.util import Pair, iter_bits, to_mask
+
+EXTRACTION_MODES = ("first", "all", "branch_and_bound", "sat")
+# how a plan is extracted from the graph:
+# "first" returns the first plan found, trying the hardest goals and the least constrained providers first,
+# "all" tries every combination of providers and returns the shortest plan found at each level,
+# "branch_and_bound" returns a plan with the minimal number of (non noOp) actions for the number of levels,
+# "sat" encodes the graph as CNF and solves it with a SAT solver instead of the backward search (see sat_extraction.py),
+# usually more slowly, once the graph has levelled off the backward search still proves that there is no plan
+# (see extract_goal)
 
 
 class GraphPlan(object):
@@ -10,47 +24,157 @@ class GraphPlan(object):
     A class for initializing and running the graphplan algorithm
     """
 
-    def __init__(self, _domain, _problem):
+    def __init__(
+        self,
+        _domain,
+        _problem,
+        mutex_mode="bitset",
+        max_no_goods=None,
+        extraction="first",
+        prune=True,
+        stats=None,
+        memory=None,
+        source=None,
+    ):
         """
         Constructor
+        _domain and _problem are file names, the domain and the problem in memory (see PgParser),
+        or _domain is a CompiledDomain (and _problem is ignored), which skips the parsing and
+        the interference table computation (and the static mutexes it holds are seeded in every level)
+        mutex_mode selects how the mutexes of each level are computed (see plan_graph_level.MUTEX_MODES)
+        max_no_goods bounds the number of nogoods kept per level (see no_good_table.py), None for unbounded,
+        the level at which the graph levelled off is never bounded (see search_plan)
+        extraction selects how plans are extracted from the graph (see EXTRACTION_MODES)
+        prune drops the propositions and the actions that no plan can use before the graph is built
+        (see CompiledDomain.prune), it is ignored when _domain is a CompiledDomain
+        stats, when given, is a stats.PlanStats that records the sizes and the expansion times of the levels
+        and the counters of the extraction attempts
+        memory, when given, is a memory.MemoryTracker that records the memory allocated by the levels
+        and the extraction attempts, and bounds it when it has a limit (see shed_caches)
+        source, when given, is a dict that describes what the problem was built from (a board and its options),
+        it is saved with the checkpoints so that a run of another problem does not resume them
+        (see checkpoint.load_checkpoint)
         """
-        self.independent_actions = set()
+        if extraction not in EXTRACTION_MODES:
+            raise ValueError(
+                "unknown extraction mode %r, expected one of %s"
+                % (extraction, ", ".join(EXTRACTION_MODES))
+            )
+        self.interference = []
+        self.mutex_mode = mutex_mode
+        self.max_no_goods = max_no_goods
+        self.extraction = extraction
+        self.stats = stats
+        self.memory = memory
+        self.source = source
         self.no_goods = []
+        self.solved = []
+        # level -> dict from a bitset of goals solved at that level to the plan found for them
         self.graph = []
-        p = PgParser(_domain, _problem)
-        self.actions, self.propositions = p.parse_actions_and_propositions()
+        self.first_level = dict()
+        # proposition index -> the first level in which the proposition appears
+        self.fixed_level = None
+        # the level at which the graph leveled off, None until it is found
+        self.size_no_good = -1
+        # number of nogoods inserted at fixed_level after the previous extraction attempt
+        self.best_plan = None
+        self.best_cost = None
+        # the best plan found so far and its number of actions (branch_and_bound extraction)
+        self.sat = None
+        # the CNF encoding of the graph (sat extraction), built on the first extraction attempt
+        self.budget = None
+        # the budget of the run in progress (see graph_plan), None when it has none
+        if isinstance(_domain, CompiledDomain):
+            compiled = _domain
+        else:
+            compiled = CompiledDomain.compile(_domain, _problem, prune)
+        self.actions, self.propositions = compiled.actions, compiled.propositions
         # list of all the actions and list of all the propositions
 
-        self.initial_state, self.goal = p.parse_problem()
+        self.initial_state, self.goal = compiled.initial_state, compiled.goal
         # the initial state and the goal state are lists of propositions
+        self.goal_mask = to_mask(self.goal)
+        # the goal state as a bitset of proposition indices
 
+        self.noops = dict()
         self.create_noops()
-        # creates noOps that are used to propagate existing propositions from one layer to the next
-
-        self.independent()
-        # creates independent actions set and updates self.independent_actions
-        PlanGraphLevel.set_independent_actions(self.independent_actions)
+        # creates the noOps that stand for the propositions that persist from one layer to the next in the plans
+
+        self.interference = compiled.interference
+        # the static interference table (see independent)
+        self.static_mutex = compiled.static_mutex
+        # the static mutex table of the propositions (see compiled_domain.static_mutex_table)
+        PlanGraphLevel.set_interference(self.interference)
+        PlanGraphLevel.set_static_mutex(self.static_mutex)
         PlanGraphLevel.set_actions(self.actions)
         PlanGraphLevel.set_props(self.propositions)
-
-    def graph_plan(self):
+        PlanGraphLevel.set_mutex_mode(mutex_mode)
+
+    def graph_plan(
+        self,
+        resume=False,
+        checkpoint=None,
+        time_limit=None,
+        max_levels=None,
+        max_nodes=None,
+        cancel=None,
+    ):
         """
         The graphplan algorithm.
         The code calls the extract function which you should complete below
+        When resume is true, the run continues from the levels already in the graph, with their
+        nogoods and solved goal sets (see checkpoint.load_checkpoint), instead of starting over.
+        When checkpoint is a file name, the state of the run is saved there after every failed
+        extraction attempt and when the run is interrupted (see checkpoint.save_checkpoint)
+        time_limit (in seconds), max_levels (levels of the graph beyond the initial one), max_nodes
+        (calls of the backward search) and cancel (a budget.CancellationToken) bound the run:
+        when one of them runs out, the run stops (saving the checkpoint when given) and returns
+        a budget.BudgetExhausted with the statistics gathered so far instead of a plan
+        (the limit of self.memory, if any, is enforced the same way)
+        """
+        self.budget = None
+        memory_limit = self.memory is not None and self.memory.limit is not None
+        if (
+            time_limit is not None
+            or max_levels is not None
+            or max_nodes is not None
+            or cancel is not None
+            or memory_limit
+        ):
+            self.budget = Budget(time_limit, max_levels, max_nodes, cancel, self.memory, self.shed_caches)
+        if self.memory is not None:
+            self.memory.start(self.no_goods if resume else ())
+        try:
+            # initialization
+            if resume and len(self.graph) > 0:
+                level = len(self.graph) - 1
+            else:
+                level = self.init_graph()
+            return self.search_plan(level, checkpoint)
+        except KeyboardInterrupt:
+            if checkpoint is not None:
+                save_checkpoint(self, checkpoint)
+            raise
+        except BudgetExceeded as exceeded:
+            if checkpoint is not None:
+                save_checkpoint(self, checkpoint)
+            return BudgetExhausted(
+                exceeded.reason,
+                len(self.graph) - 1,
+                self.budget.nodes,
+                self.budget.elapsed(),
+                self.stats,
+            )
+        finally:
+            self.budget = None
+            if self.memory is not None:
+                self.memory.stop()
+
+    def search_plan(self, level, checkpoint=None):
+        """
+        Expands the graph from the given level until a plan is extracted or the graph
+        is proven to have no plan, returns the plan or None
         """
-        # initialization
-        init_state = self.initial_state
-        level = 0
-        self.no_goods = []  # make sure you update noGoods in your backward search!
-        self.no_goods.append([])
-        # create first layer of the graph, note it only has a proposition layer which consists of the initial state.
-        prop_layer_init = PropositionLayer()
-        for prop in init_state:
-            prop_layer_init.add_proposition(prop)
-        pg_init = PlanGraphLevel()
-        pg_init.set_proposition_layer(prop_layer_init)
-        self.graph.append(pg_init)
-        size_no_good = -1
 
         """
         While the layer does not contain all of the propositions in the goal state,
@@ -59,99 +183,320 @@ class GraphPlan(object):
         """
 
         while self.goal_state_not_in_prop_layer(
-            self.graph[level].get_proposition_layer().get_propositions()
+            self.graph[level].get_proposition_layer().get_mask()
         ) or self.goal_state_has_mutex(self.graph[level].get_proposition_layer()):
             if self.is_fixed(level):
                 return None
                 # this means we stopped the while loop above because we reached a fixed point in the graph.
                 #  nothing more to do, we failed!
 
-            self.no_goods.append([])
-            level = level + 1
-            pg_next = PlanGraphLevel()  # create new PlanGraph object
-            pg_next.expand(
-                self.graph[level - 1]
-            )  # calls the expand function, which you are implementing in the PlanGraph class
-            self.graph.append(pg_next)  # appending the new level to the plan graph
+            level = self.expand_graph()  # appending the new level to the plan graph
 
-            size_no_good = len(self.no_goods[level])  # remember size of nogood table
-
-        plan_solution = self.extract(self.graph, self.goal, level)
+        plan_solution = self.attempt_extraction(level)
         # try to extract a plan since all of the goal propositions are in current graph level, and are not mutex
 
         while plan_solution is None:  # while we didn't extract a plan successfully
-            level = level + 1
-            self.no_goods.append([])
-            pg_next = PlanGraphLevel()  # create next level of the graph by expanding
-            pg_next.expand(
-                self.graph[level - 1]
-            )  # create next level of the graph by expanding
-            self.graph.append(pg_next)
-            plan_solution = self.extract(
-                self.graph, self.goal, level
-            )  # try to extract a plan again
+            if checkpoint is not None:
+                save_checkpoint(self, checkpoint)
+            level = self.expand_graph()  # create next level of the graph by expanding
+            plan_solution = self.attempt_extraction(level)  # try to extract a plan again
             if plan_solution is None and self.is_fixed(
                 level
             ):  # if failed and reached fixed point
-                if len(self.no_goods[level - 1]) == len(self.no_goods[level]):
-                    # if size of nogood didn't change, means there's nothing more to do. We failed.
+                if self.fixed_level is None:
+                    self.fixed_level = level - 1
+                    self.no_goods[self.fixed_level].max_size = None
+                    # the nogoods of the fixed level are never evicted (whatever max_no_goods and shed_caches),
+                    # an evicted nogood found again would count as a new one in the test below
+                elif self.no_goods[self.fixed_level].inserted == self.size_no_good:
+                    # if the nogoods at the fixed level didn't change, means there's nothing more to do. We failed.
                     return None
-                size_no_good = len(
-                    self.no_goods[level]
-                )  # we didn't fail yet! update size of no good
+                self.size_no_good = self.no_goods[
+                    self.fixed_level
+                ].inserted  # we didn't fail yet! update size of no good
+        return plan_solution
+
+    def attempt_extraction(self, level):
+        """
+        Tries to extract a plan for the goal from the given level, recording the attempt in self.stats and self.memory
+        """
+        if self.memory is not None:
+            before = self.memory.current()
+            try:
+                return self.extract_with_stats(level)
+            finally:
+                self.memory.end_extraction(level, before, self.no_goods, self.solved)
+        return self.extract_with_stats(level)
+
+    def extract_with_stats(self, level):
+        if self.stats is None:
+            return self.extract_goal(level)
+        self.stats.start_extraction(self.no_goods)
+        plan_solution = None
+        try:
+            plan_solution = self.extract_goal(level)
+        finally:
+            # an attempt stopped by the budget is recorded as a failed one
+            self.stats.end_extraction(level, self.no_goods, plan_solution)
         return plan_solution
 
+    def extract_goal(self, level):
+        """
+        Extracts a plan for the goal from the given level with the extraction mode of the run,
+        returns None if there is none.
+        The sat extraction records no nogoods, so once the graph has levelled off, the levels it proves
+        to have no plan are searched again by the backward search, whose nogoods at the fixed level
+        let search_plan prove that there is no plan at all
+        """
+        if self.extraction != "sat":
+            return self.extract(self.graph, self.goal, level)
+        plan_solution = self.sat_extract(self.graph, self.goal, level)
+        if plan_solution is None and self.fixed_level is not None:
+            return self.extract(self.graph, self.goal, level)
+        return plan_solution
+
+    def init_graph(self):
+        """
+        Creates the first level of the graph (with its nogood table) and returns it
+        """
+        init_state = self.initial_state
+        level = 0
+        self.no_goods = []  # make sure you update noGoods in your backward search!
+        self.no_goods.append(NoGoodTable(self.max_no_goods))
+        self.solved = []  # solved goal sets are kept across the extraction attempts
+        self.solved.append(dict())
+        self.graph = []
+        self.first_level = dict()
+        self.fixed_level = None
+        self.size_no_good = -1
+        self.sat = None
+        # create first layer of the graph, note it only has a proposition layer which consists of the initial state.
+        with measure(self.memory, "layers"):
+            prop_layer_init = PropositionLayer()
+            for prop in init_state:
+                prop_layer_init.add_proposition(prop)
+            pg_init = PlanGraphLevel()
+            pg_init.set_proposition_layer(prop_layer_init)
+        self.graph.append(pg_init)
+        self.update_first_levels(level)
+        if self.stats is not None:
+            self.stats.end_level(level, pg_init, self.stats.now())
+        if self.memory is not None:
+            self.memory.end_level(level)
+        return level
+
+    def expand_graph(self):
+        """
+        Expands the graph by one level (with its nogood table) and returns the new level
+        """
+        level = len(self.graph)
+        if self.budget is not None:
+            self.budget.check_level(level)
+        start = None if self.stats is None else self.stats.now()
+        pg_next = PlanGraphLevel()  # create new PlanGraph object
+        pg_next.expand(
+            self.graph[level - 1], self.stats, self.budget, self.memory
+        )  # calls the expand function, which you are implementing in the PlanGraph class
+        # the level is only added once complete, so an interrupted expansion leaves the graph as it was
+        self.no_goods.append(NoGoodTable(self.max_no_goods))
+        self.solved.append(dict())
+        self.graph.append(pg_next)
+        self.update_first_levels(level)
+        if self.stats is not None:
+            self.stats.end_level(level, pg_next, start)
+        if self.memory is not None:
+            self.memory.end_level(level)
+        return level
+
+    def shed_caches(self):
+        """
+        Sheds the caches of the search when the memory gets near the limit of self.memory:
+        the solved goal sets are dropped first, then if that is not enough and the nogoods hold
+        a meaningful share of the memory (see memory.SHED_SHARE), every nogood table above
+        memory.SHED_FLOOR nogoods is bounded to half its size (the least recently used nogoods
+        are evicted, see NoGoodTable.set_max_size), so that the tables cannot grow back to it.
+        Both only spare the search some work, a search without them finds the same plans.
+        The table of the level at which the graph leveled off is never shed: search_plan proves
+        that there is no plan when no new nogood is inserted there, and evicted nogoods found again
+        would count as new ones
+        """
+        if not self.memory.near_limit():
+            return
+        entries = sum(len(table) for table in self.solved)
+        if entries > 0:
+            before = self.memory.current()
+            for table in self.solved:
+                table.clear()
+            self.memory.record_shed("solved", entries, before - self.memory.current())
+            if not self.memory.near_limit():
+                return
+        if self.memory.no_goods_bytes < SHED_SHARE * self.memory.current():
+            return  # the memory is held by the graph, dropping nogoods would only slow the search down
+        before = self.memory.current()
+        entries = 0
+        estimated = 0  # the tracing misses the nogoods restored from a checkpoint, see MemoryTracker.start
+        for level, table in enumerate(self.no_goods):
+            if level != self.fixed_level and len(table) > SHED_FLOOR:
+                size = table.size_bytes()
+                entries += table.set_max_size(max(len(table) // 2, SHED_FLOOR))
+                estimated += size - table.size_bytes()
+        if entries > 0:
+            freed = before - self.memory.current()
+            self.memory.no_goods_bytes = max(self.memory.no_goods_bytes - max(freed, estimated), 0)
+            self.memory.record_shed("no_goods", entries, freed)
+
+    def add_no_good(self, level, goals):
+        """
+        Adds the bitset goals as a nogood of level, counting the memory it takes in self.memory (see shed_caches)
+        """
+        if self.memory is None:
+            self.no_goods[level].add(goals)
+            return
+        before = self.memory.current()
+        self.no_goods[level].add(goals)
+        self.memory.no_goods_bytes += self.memory.current() - before
+
+    def update_first_levels(self, level):
+        """
+        Records the propositions that first appear in the given level of the graph
+        """
+        new_propositions = self.graph[level].get_proposition_layer().get_mask()
+        if level > 0:
+            new_propositions &= ~self.graph[level - 1].get_proposition_layer().get_mask()
+        for index in iter_bits(new_propositions):
+            self.first_level[index] = level
+
+    def order_goals(self, sub_goals):
+        """
+        Orders the goals from the hardest to the easiest one,
+        that is by decreasing level of first appearance in the graph
+        """
+        return sorted(
+            sub_goals, key=lambda g: (-self.first_level.get(g.index, 0), g.index)
+        )
+
     def extract(self, graph, sub_goals, level):
         """
         The backsearch part of graphplan that tries
         to extract a plan when all goal propositions exist in a graph plan level.
+        The levels of the graph never change once expanded, so the plan found for a set of goals
+        at a level is kept in self.solved and reused by later searches and extraction attempts,
+        just like the nogoods are.
+        The search recurses once per goal and once per level, which deep graphs take beyond the
+        recursion limit of Python, so its steps are generators run on an explicit stack (see run_steps)
         """
-
+        if self.extraction == "branch_and_bound":
+            self.best_plan = None
+            self.best_cost = None
+            run_steps(self.bnb_extract(graph, sub_goals, level, [], 0))
+            return self.best_plan
+        return run_steps(self.extract_steps(graph, sub_goals, level))
+
+    def extract_steps(self, graph, sub_goals, level):
+        """
+        The steps of extract (see run_steps)
+        """
+        if self.stats is not None:
+            self.stats.count("extract_calls")
         if level == 0:
             return []
-        if sub_goals in self.no_goods[level]:
+        goals = to_mask(sub_goals)
+        solved = self.solved[level].get(goals)
+        if solved is not None:
+            if self.stats is not None:
+                self.stats.count("solved_hits")
+            return list(solved)
+        if self.no_goods[level].is_no_good(goals):
             return None
-        plan_solution = self.gp_search(graph, sub_goals, [], level)
+        plan_solution = yield self.gp_search(graph, self.order_goals(sub_goals), [], level)
         if plan_solution is not None:
+            self.solved[level][goals] = tuple(plan_solution)
             return plan_solution
-        self.no_goods[level].append([sub_goals])
+        self.add_no_good(level, goals)
         return None
 
-    def gp_search(self, graph, sub_goals, _plan, level):
+    def sat_extract(self, graph, sub_goals, level):
+        """
+        SAT version of extract (see sat_extraction.py), the levels of the graph are added to the
+        encoding as they are expanded, and every conflict of the solver is a node of the budget
+        """
+        if self.stats is not None:
+            self.stats.count("extract_calls")
+        if self.sat is None:
+            self.sat = GraphEncoding(self)
+        tick = None if self.budget is None else self.budget.charge_node
+        return self.sat.solve(graph, sub_goals, level, tick)
+
+    def providers(self, graph, prop, plan_mutex, level):
+        """
+        Returns the actions of the given level that add prop and are compatible with the partial plan,
+        plan_mutex is the bitset of the actions that are mutex with some action of the partial plan.
+        The candidates are read from the producers index of the level, noOps first and then
+        by increasing number of mutexes in the level (the least constraining first)
+        """
+        plan_graph_level = graph[level]
+        providers = [
+            self.actions[index]
+            for index in iter_bits(
+                plan_graph_level.get_action_layer().get_producers(prop) & ~plan_mutex
+            )
+        ]
+        noop = self.noops.get(prop.index)
+        if noop is not None and plan_graph_level.has_noop(prop) and not (plan_mutex >> noop.index) & 1:
+            providers.append(noop)
+        providers.sort(
+            key=lambda act: (
+                not act.is_noop(),
+                plan_graph_level.get_mutex_row(act.index).bit_count(),
+                act.index,
+            )
+        )
+        return providers
+
+    def gp_search(self, graph, sub_goals, _plan, level, plan_mutex=0):
+        """
+        Searches for providers of sub_goals at the given level that are compatible with _plan,
+        plan_mutex is the bitset of the actions mutex with some action of _plan (see providers).
+        A step of extract, see run_steps
+        """
+        if self.stats is not None:
+            self.stats.count("search_calls")
+        if self.budget is not None:
+            self.budget.charge_node()
         if len(sub_goals) == 0:
             new_goals = []
+            new_goals_mask = 0
             for action in _plan:
                 for prop in action.get_pre():
-                    if prop not in new_goals:
+                    if not (new_goals_mask >> prop.index) & 1:
+                        new_goals_mask |= 1 << prop.index
                         new_goals.append(prop)
-            new_plan = self.extract(graph, new_goals, level - 1)
+            new_plan = yield self.extract_steps(graph, new_goals, level - 1)
             if new_plan is None:
                 return None
             else:
                 return new_plan + _plan
 
         prop = sub_goals[0]
-        providers = []
-        for action1 in [
-            act
-            for act in graph[level].get_action_layer().get_actions()
-            if prop in act.get_add()
-        ]:
-            no_mutex = True
-            for action2 in _plan:
-                if Pair(action1, action2) not in self.independent_actions:
-                    no_mutex = False
-                    break
-            if no_mutex:
-                providers.append(action1)
+        providers = self.providers(graph, prop, plan_mutex, level)
 
         plans = []
         for action in providers:
-            new_sub_goals = [g for g in sub_goals if g not in action.get_add()]
+            new_sub_goals = [
+                g for g in sub_goals if not (action.add_mask >> g.index) & 1
+            ]
             plan_clone = list(_plan)
             plan_clone.append(action)
-            new_plan = self.gp_search(graph, new_sub_goals, plan_clone, level)
+            new_plan = yield self.gp_search(
+                graph,
+                new_sub_goals,
+                plan_clone,
+                level,
+                plan_mutex | graph[level].get_mutex_row(action.index),
+            )
             if new_plan is not None:
+                if self.extraction != "all":
+                    return new_plan
                 plans.append(new_plan)
         if len(plans) > 0:
             plans_size = list(map(lambda p: len(p), plans))
@@ -159,16 +504,77 @@ class GraphPlan(object):
             return plans[min_index]
         return None
 
-    def goal_state_not_in_prop_layer(self, propositions):
+    def bnb_extract(self, graph, sub_goals, level, plan_above, cost_above):
         """
-        Helper function that receives a  list of propositions (propositions) and returns true
-        if not all the goal propositions are in that list
+        Branch and bound version of extract: plan_above is the plan already chosen for the levels
+        above this one, and cost_above its number of (non noOp) actions.
+        Complete plans that are cheaper than self.best_plan replace it.
+        Returns false only if the goals are unachievable at this level, in which case they are a nogood
+        (a search that was cut by the bound does not prove anything).
+        A step of extract, see run_steps
         """
-        for goal in self.goal:
-            if goal not in propositions:
-                return True
+        if self.stats is not None:
+            self.stats.count("extract_calls")
+        if level == 0:
+            if self.best_cost is None or cost_above < self.best_cost:
+                self.best_plan = plan_above
+                self.best_cost = cost_above
+            return True
+        goals = to_mask(sub_goals)
+        if self.no_goods[level].is_no_good(goals):
+            return False
+        achievable = yield self.bnb_search(graph, self.order_goals(sub_goals), [], level, plan_above, cost_above)
+        if achievable:
+            return True
+        self.add_no_good(level, goals)
         return False
 
+    def bnb_search(self, graph, sub_goals, _plan, level, plan_above, cost_above, plan_mutex=0):
+        """
+        Branch and bound version of gp_search, see bnb_extract
+        """
+        if self.stats is not None:
+            self.stats.count("search_calls")
+        if self.budget is not None:
+            self.budget.charge_node()
+        cost = cost_above + len([act for act in _plan if not act.is_noop()])
+        if self.best_cost is not None and cost >= self.best_cost:
+            return True  # cut by the bound
+        if len(sub_goals) == 0:
+            new_goals = []
+            new_goals_mask = 0
+            for action in _plan:
+                for prop in action.get_pre():
+                    if not (new_goals_mask >> prop.index) & 1:
+                        new_goals_mask |= 1 << prop.index
+                        new_goals.append(prop)
+            return (yield self.bnb_extract(graph, new_goals, level - 1, _plan + plan_above, cost))
+
+        possible = False
+        for action in self.providers(graph, sub_goals[0], plan_mutex, level):
+            new_sub_goals = [
+                g for g in sub_goals if not (action.add_mask >> g.index) & 1
+            ]
+            achievable = yield self.bnb_search(
+                graph,
+                new_sub_goals,
+                _plan + [action],
+                level,
+                plan_above,
+                cost_above,
+                plan_mutex | graph[level].get_mutex_row(action.index),
+            )
+            if achievable:
+                possible = True
+        return possible
+
+    def goal_state_not_in_prop_layer(self, propositions):
+        """
+        Helper function that receives a bitset of propositions (propositions) and returns true
+        if not all the goal propositions are in that bitset
+        """
+        return self.goal_mask & ~propositions != 0
+
     def goal_state_has_mutex(self, prop_layer):
         """
         Helper function that checks whether all goal propositions are non mutex at the current graph level
@@ -197,7 +603,10 @@ class GraphPlan(object):
 
     def create_noops(self):
         """
-        Creates the noOps that are used to propagate propositions from one layer to the next
+        Creates the noOps that stand for the propositions that persist from one layer to the next.
+        They are not part of the actions of the problem: the persistence is implicit in the plan graph,
+        and the noOp of a proposition has the index len(self.actions) + its index in the mutex rows
+        of the levels (see PlanGraphLevel.get_mutex_row), the noOps only appear in the extracted plans
         """
         for prop in self.propositions:
             name = prop.name
@@ -206,23 +615,20 @@ class GraphPlan(object):
             precon.append(prop)
             add.append(prop)
             delete = []
-            act = Action(name, precon, add, delete, True)
-            self.actions.append(act)
-            prop.add_producer(act)
+            act = Action(name, precon, add, delete, True, len(self.actions) + prop.index)
+            act.update_masks()
+            self.noops[prop.index] = act
 
     def independent(self):
         """
-        Creates a set of independent actions
+        Creates the static interference table: self.interference[i] is the bitset of the
+        actions that are not independent of the action with index i (see independent_pair).
+        The table is computed when the problem is compiled (see compiled_domain.interference_table)
         """
-        for i in range(len(self.actions)):
-            for j in range(i + 1, len(self.actions)):
-                act1 = self.actions[i]
-                act2 = self.actions[j]
-                if independent_pair(act1, act2):
-                    self.independent_actions.add(Pair(act1, act2))
+        self.interference = interference_table(self.actions)
 
     def is_independent(self, a1, a2):
-        return Pair(a1, a2) in self.independent_actions
+        return a1 != a2 and not (self.interference[a1.index] >> a2.index) & 1
 
     @staticmethod
     def no_mutex_action_in_plan(plan_, act, action_layer):
@@ -236,6 +642,26 @@ class GraphPlan(object):
         return True
 
 
+def run_steps(steps):
+    """
+    Runs a search written as generators on an explicit stack instead of the call stack:
+    a step yields the generator of a sub-step to call it, and is resumed with the value the sub-step returns.
+    Returns the value returned by steps
+    """
+    stack = [steps]
+    value = None
+    while stack:
+        try:
+            sub_step = stack[-1].send(value)
+        except StopIteration as stop:
+            stack.pop()
+            value = stop.value
+            continue
+        stack.append(sub_step)
+        value = None
+    return value
+
+
 def independent_pair(a1, a2):
     """
     Returns true if the actions are neither have inconsistent effects
@@ -249,34 +675,22 @@ def independent_pair(a1, a2):
     a1.is_neg_effect(p) returns true is p is in a1.get_delete()
     """
     "*** YOUR CODE HERE ***"
-    add_a1 = a1.get_add()
-    add_a2 = a2.get_add()
-    pre_a1 = a1.get_pre()
-    pre_a2 = a2.get_pre()
-
-    for prop in add_a1:
-        if a2.is_neg_effect(prop):
-            return False
-
-    for prop in add_a2:
-        if a1.is_neg_effect(prop):
-            return False
-
-    for prop in pre_a1:
-        if a2.is_neg_effect(prop):
-            return False
-
-    for prop in pre_a2:
-        if a1.is_neg_effect(prop):
-            return False
-
+    # inconsistent effects or interference: one action deletes
+    # an add effect or a precondition of the other one
+    if (a1.add_mask | a1.pre_mask) & a2.del_mask:
+        return False
+    if (a2.add_mask | a2.pre_mask) & a1.del_mask:
+        return False
     return True
 
 
 def parse_solution(plan):
+    # returns the moves of the plan as (car, DIRECTION, steps, player) tuples, the format replayed by Display.py,
+    # a move of several squares is named ..._By_<steps> (see rushhour.create_move_lists)
     solution = []
     for act in plan:
         if not act.is_noop():
             parsed_act = act.name.split("_")
-            solution.append((parsed_act[0], parsed_act[2], 1, "X"))
+            steps = int(parsed_act[7]) if len(parsed_act) > 7 else 1
+            solution.append((parsed_act[0], parsed_act[2].upper(), steps, "X"))
     return solution
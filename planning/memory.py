@@ -0,0 +1,154 @@
+"""
+Memory accounting of GraphPlan runs, measured with tracemalloc: a MemoryTracker given to GraphPlan records
+the peak of the run, and for every level of the planning graph the bytes allocated for its layers
+(actions and propositions) and for its mutexes (see CATEGORIES), and for every extraction attempt
+the bytes retained by the nogoods and the solved goal sets it added.
+
+A tracker with a limit also bounds the memory of the run: once the memory allocated since the start
+of the run exceeds shed_at times the limit, GraphPlan sheds its caches (the solved goal sets first,
+then part of the nogoods when they hold a meaningful share of the memory, see GraphPlan.shed_caches),
+and the run only stops (see budget.BudgetExhausted) if it is still above the limit after that.
+Tracing every allocation slows the planner down a lot, the backward search most (board 21 is solved about
+15 times slower), so it is only enabled while a tracked run is in progress.
+"""
+
+import json
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+CATEGORIES = ("layers", "mutexes")
+# what the memory allocated by the expansion of a level is attributed to (see PlanGraphLevel.expand)
+SHED_SHARE = 0.25  # the nogoods are only shed when they hold at least that fraction of the memory in use
+SHED_FLOOR = 256  # a nogood table is never shed below that many nogoods
+
+
+def measure(memory, category):
+    # returns a context manager that attributes the memory allocated by the enclosed code to category,
+    # that does nothing when memory is None
+    if memory is None:
+        return nullcontext()
+    return memory.measure(category)
+
+
+class MemoryTracker(object):
+    """
+    The memory accounting of a GraphPlan run (see the module documentation).
+    limit is in bytes, None for no limit
+    """
+
+    def __init__(self, limit=None, shed_at=0.9):
+        """
+        Constructor
+        """
+        self.limit = limit
+        self.shed_at = shed_at  # fraction of the limit above which the caches are dropped
+        self.levels = []  # one record (dict) per level of the graph
+        self.extractions = []  # one record (dict) per extraction attempt
+        self.sheds = []  # one record (dict) per cache dropped
+        self.peak = 0  # the peak of the memory allocated since start, in bytes
+        self.base = 0  # the traced memory at start
+        self.started = False  # true if start enabled tracemalloc, which stop then disables
+        self.allocated = dict()  # category -> bytes allocated in the level being expanded
+        self.no_goods_bytes = 0  # bytes held by the nogoods of the run (see start and GraphPlan.add_no_good)
+
+    def start(self, no_goods=()):
+        """
+        Starts tracing the memory allocations (see tracemalloc),
+        no_goods are the nogood tables the run already holds (restored from a checkpoint), that were allocated
+        before the tracing started: their size is estimated (see NoGoodTable.size_bytes) instead of traced
+        """
+        self.started = not tracemalloc.is_tracing()
+        if self.started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self.base = tracemalloc.get_traced_memory()[0]
+        self.allocated = dict()
+        self.no_goods_bytes = sum(table.size_bytes() for table in no_goods)
+
+    def stop(self):
+        self.update_peak()
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
+
+    def current(self):
+        """
+        Returns the memory allocated since start and still in use, in bytes
+        """
+        return tracemalloc.get_traced_memory()[0] - self.base
+
+    def update_peak(self):
+        if tracemalloc.is_tracing():
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1] - self.base)
+
+    def near_limit(self):
+        return self.limit is not None and self.current() > self.limit * self.shed_at
+
+    def over_limit(self):
+        return self.limit is not None and self.current() > self.limit
+
+    @contextmanager
+    def measure(self, category):
+        """
+        Attributes the memory allocated by the enclosed code to category in the level being expanded
+        """
+        before = self.current()
+        try:
+            yield
+        finally:
+            self.allocated[category] = self.allocated.get(category, 0) + self.current() - before
+
+    def end_level(self, level):
+        """
+        Records the memory allocated by the expansion of level
+        """
+        self.update_peak()
+        record = {"level": level}
+        for category in CATEGORIES:
+            record[category + "_bytes"] = self.allocated.get(category, 0)
+        record["current_bytes"] = self.current()
+        self.allocated = dict()
+        self.levels.append(record)
+
+    def end_extraction(self, level, before, no_goods, solved):
+        """
+        Records the extraction attempt from level, that started when before bytes were in use,
+        no_goods and solved are the nogood tables and the solved goal sets of the levels of the graph
+        """
+        self.update_peak()
+        current = self.current()
+        self.extractions.append(
+            {
+                "level": level,
+                "no_goods_bytes": current - before,
+                "no_goods": sum(len(table) for table in no_goods),
+                "solved": sum(len(table) for table in solved),
+                "current_bytes": current,
+            }
+        )
+
+    def record_shed(self, cache, entries, freed):
+        """
+        Records that the cache ("solved" or "no_goods") was dropped, with its number of entries and the bytes freed
+        """
+        self.sheds.append({"cache": cache, "entries": entries, "freed_bytes": freed})
+
+    def to_dict(self):
+        self.update_peak()
+        return {
+            "limit_bytes": self.limit,
+            "peak_bytes": self.peak,
+            "levels": self.levels,
+            "extractions": self.extractions,
+            "sheds": self.sheds,
+        }
+
+    def to_json(self, path=None):
+        """
+        Returns the memory accounting as a JSON string, and writes it to path when given
+        """
+        text = json.dumps(self.to_dict(), indent=2)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
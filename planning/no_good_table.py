@@ -0,0 +1,104 @@
+import sys
+from collections import OrderedDict
+
+from planning.util import iter_bits, lowest_bit
+
+
+class NoGoodTable(object):
+    """
+    A class for the nogoods of one level of the graph:
+    sets of goals that are known to be unachievable at this level.
+    Each nogood is a bitset of proposition indices, which is its canonical (hashable) key.
+    Every nogood is also indexed by its lowest proposition, so a set of goals is
+    recognized as a nogood when it is a superset of a known one, by looking only at
+    the nogoods indexed by one of its goals.
+    When max_size is set, the least recently used nogoods are evicted above that size.
+    """
+
+    def __init__(self, max_size=None):
+        """
+        Constructor
+        """
+        self.max_size = max_size  # maximal number of nogoods kept, None for unbounded
+        self.entries = OrderedDict()  # nogood bitset -> None, from least to most recently used
+        self.by_lowest = dict()  # proposition index -> set of nogoods whose lowest proposition it is
+        self.inserted = 0  # number of nogoods ever added (evicted ones included)
+        self.hits = 0  # number of lookups that found a nogood
+
+    def add(self, goals):
+        """
+        Adds the bitset goals as a nogood
+        """
+        if goals in self.entries:
+            self.entries.move_to_end(goals)
+            return
+        self.entries[goals] = None
+        self.by_lowest.setdefault(lowest_bit(goals), set()).add(goals)
+        self.inserted += 1
+        if self.max_size is not None:
+            while len(self.entries) > self.max_size:
+                evicted, _ = self.entries.popitem(last=False)
+                self.discard_index(evicted)
+
+    def set_max_size(self, max_size):
+        """
+        Bounds the table to max_size nogoods, evicting the least recently used ones above it,
+        returns the number of nogoods evicted
+        """
+        self.max_size = max_size
+        evicted = 0
+        while len(self.entries) > max_size:
+            no_good, _ = self.entries.popitem(last=False)
+            self.discard_index(no_good)
+            evicted += 1
+        return evicted
+
+    def discard_index(self, goals):
+        index = lowest_bit(goals)
+        no_goods = self.by_lowest[index]
+        no_goods.discard(goals)
+        if not no_goods:
+            del self.by_lowest[index]
+
+    def find(self, goals):
+        """
+        Returns a nogood that is a subset of the bitset goals (goals itself first), None if there is none
+        """
+        if goals in self.entries:
+            return goals
+        for index in iter_bits(goals):
+            for no_good in self.by_lowest.get(index, ()):
+                if no_good & ~goals == 0:
+                    return no_good
+        return None
+
+    def is_no_good(self, goals):
+        """
+        Returns true if the bitset goals is a known nogood or a superset of one
+        """
+        no_good = self.find(goals)
+        if no_good is None:
+            return False
+        self.entries.move_to_end(no_good)
+        self.hits += 1
+        return True
+
+    def size_bytes(self):
+        """
+        Returns an estimate of the bytes held by the table: the sizes of its containers and of its nogoods
+        (see sys.getsizeof)
+        """
+        size = sys.getsizeof(self.entries) + sys.getsizeof(self.by_lowest)
+        size += sum(sys.getsizeof(no_good) for no_good in self.entries)
+        size += sum(sys.getsizeof(no_goods) for no_goods in self.by_lowest.values())
+        return size
+
+    def clear(self):
+        self.entries.clear()
+        self.by_lowest.clear()
+
+    def __contains__(self, goals):
+        return self.find(goals) is not None
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,119 @@
+"""
+NumPy backend for the "numpy" mutex mode of PlanGraphLevel.
+The mutex relations of a level are computed as boolean matrix products over the
+precondition / effect incidence matrices of the actions in the layer,
+and returned as bit-packed rows (index -> int bitset) like the ones kept by util.MutexSet.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the "numpy" mutex mode
+    np = None
+
+from planning.util import iter_bits
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError("the numpy mutex mode requires numpy to be installed")
+
+
+def incidence(items, get_list, size):
+    """
+    Returns the len(items) x size boolean matrix M with M[i][p] = True
+    iff the proposition with index p is in get_list(items[i])
+    """
+    matrix = np.zeros((len(items), size), dtype=bool)
+    for i, item in enumerate(items):
+        for prop in get_list(item):
+            matrix[i, prop.index] = True
+    return matrix
+
+
+def unpack_rows(rows, indices, size):
+    """
+    Returns the len(indices) x size boolean matrix whose i-th row
+    is the bitset rows[indices[i]]
+    """
+    n_bytes = (size + 7) // 8
+    matrix = np.zeros((len(indices), n_bytes), dtype=np.uint8)
+    for i, index in enumerate(indices):
+        row = rows.get(index, 0)
+        if row:
+            matrix[i] = np.frombuffer(row.to_bytes(n_bytes, "little"), dtype=np.uint8)
+    return np.unpackbits(matrix, axis=1, count=size, bitorder="little").astype(bool)
+
+
+def pack_rows(matrix, indices):
+    """
+    The inverse of unpack_rows, returns the rows of matrix as a dict indices[i] -> int bitset
+    """
+    packed = np.packbits(matrix, axis=1, bitorder="little")
+    return {
+        index: int.from_bytes(packed[i].tobytes(), "little")
+        for i, index in enumerate(indices)
+    }
+
+
+def product(a, b):
+    """
+    Boolean matrix product of a and b
+    """
+    return (a.astype(np.float32) @ b.astype(np.float32)) > 0
+
+
+def action_mutex_rows(actions, prop_mutex_rows, n_actions, n_props):
+    """
+    Returns the action mutex rows of a layer that contains actions,
+    given the proposition mutex rows of the previous layer.
+    Interference is Use x Del^T (and its transpose) where Use are the pre and add lists,
+    competing needs is Pre x MutexProps x Pre^T.
+    """
+    require_numpy()
+    actions = list(actions)
+    n_props = max([n_props] + [prop.index + 1 for a in actions for prop in a.get_pre()])
+    pre = incidence(actions, lambda a: a.get_pre(), n_props)
+    use = pre | incidence(actions, lambda a: a.get_add(), n_props)
+    delete = incidence(actions, lambda a: a.get_delete(), n_props)
+    prop_mutex = unpack_rows(prop_mutex_rows, range(n_props), n_props)
+
+    interference = product(use, delete.T)
+    competing_needs = product(product(pre, prop_mutex), pre.T)
+    mutex = interference | interference.T | competing_needs
+    np.fill_diagonal(mutex, False)
+
+    indices = np.array([a.index for a in actions], dtype=np.int64)
+    rows = np.zeros((len(actions), n_actions), dtype=bool)
+    rows[:, indices] = mutex
+    return pack_rows(rows, indices.tolist())
+
+
+def proposition_mutex_rows(propositions, get_producers, action_mutex_rows, n_actions, n_props, persisting=0):
+    """
+    Returns the proposition mutex rows of a layer that contains propositions,
+    where get_producers(prop) is the bitset of the actions of the layer that add prop,
+    given the action mutex rows of the same level over the actions and the noOps:
+    the noOp of the proposition p has the index n_actions + p, and persisting is
+    the bitset of the propositions that have a noOp (see PlanGraphLevel.get_mutex_row).
+    Two propositions are not mutex iff a pair of their producers is not mutex,
+    which is Producers x (not MutexActions) x Producers^T.
+    """
+    require_numpy()
+    propositions = list(propositions)
+    n_producers = n_actions + max([n_props] + [p.index + 1 for p in propositions])
+    producers = np.zeros((len(propositions), n_producers), dtype=bool)
+    for i, prop in enumerate(propositions):
+        for index in iter_bits(get_producers(prop)):
+            producers[i, index] = True
+        if (persisting >> prop.index) & 1:
+            producers[i, n_actions + prop.index] = True
+    compatible = ~unpack_rows(action_mutex_rows, range(n_producers), n_producers)
+    not_mutex = product(product(producers, compatible), producers.T)
+    mutex = ~not_mutex
+    np.fill_diagonal(mutex, False)
+
+    indices = np.array([p.index for p in propositions], dtype=np.int64)
+    n_props = max([n_props] + [index + 1 for index in indices.tolist()])
+    rows = np.zeros((len(propositions), n_props), dtype=bool)
+    rows[:, indices] = mutex
+    return pack_rows(rows, indices.tolist())
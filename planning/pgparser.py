@@ -5,91 +5,129 @@ from planning.proposition import Proposition
 class PgParser:
     """
     A utility class for parsing the domain and problem.
+    The domain and the problem are read from files, or given in memory:
+    the domain as a pair (proposition names, actions) where every action is a tuple
+    (name, pre, add, delete) of lists of proposition names, and the problem as a pair
+    (initial state, goal state) of lists of proposition names (see rushhour.create_domain_and_problem).
+    The domain may also hold invariant groups, lists of proposition names of which at most one holds
+    in any reachable state: a third element of the in-memory domain, or "Group:" lines after the actions
+    of a domain file (see get_mutex_groups).
     """
 
     def __init__(self, domain_file, problem_file):
         """
         Constructor
+        domain_file and problem_file are file names, or the domain and the problem themselves
         """
         self.domain_file = domain_file
         self.problem_file = problem_file
+        self.propositions_by_name = dict()  # name -> interned Proposition
+        self.group_names = []  # the invariant groups of the domain, as lists of proposition names
 
     def parse_actions_and_propositions(self):
-        propositions = []
-        f = open(self.domain_file, "r")
-        _ = f.readline()
-        proposition_line = f.readline()
-        words = [
-            word.rstrip()
-            for word in proposition_line.split(" ")
-            if len(word.rstrip()) > 0
-        ]
-        for i in range(0, len(words)):
-            propositions.append(Proposition(words[i]))
-        actions = []
-        f = open(self.domain_file, "r")
-        line = f.readline()
-        while line != "":
-            words = [
-                word.rstrip() for word in line.split(" ") if len(word.rstrip()) > 0
-            ]
-            if words[0] == "Name:":
+        if not isinstance(self.domain_file, str):
+            proposition_names, actions = self.domain_file[:2]
+            self.group_names = list(self.domain_file[2]) if len(self.domain_file) > 2 else []
+            return self.build_domain(proposition_names, actions)
+        with open(self.domain_file, "r") as f:
+            return self.build_domain(*self.read_domain(f, self.group_names))
+
+    @staticmethod
+    def read_domain(lines, groups=None):
+        """
+        Reads the lines of a domain file, returns the list of the proposition names
+        and a generator of the actions (see read_actions), so that the actions are
+        built while the file is read. The invariant groups of the file are appended to groups
+        once the generator is exhausted
+        """
+        lines = iter(lines)
+        _ = next(lines)
+        proposition_names = next(lines).split()
+        return proposition_names, PgParser.read_actions(lines, groups)
+
+    @staticmethod
+    def read_actions(lines, groups=None):
+        """
+        Yields the actions of the lines of a domain file as tuples (name, pre, add, delete),
+        the "Group:" lines are appended to groups as lists of proposition names
+        """
+        for line in lines:
+            words = line.split()
+            if len(words) > 0 and words[0] == "Name:":
                 name = words[1]
-                line = f.readline()
-                precond = []
-                add = []
-                delete = []
-                words = [
-                    word.rstrip() for word in line.split(" ") if len(word.rstrip()) > 0
-                ]
-                for i in range(1, len(words)):
-                    precond.append(Proposition(words[i]))
-                line = f.readline()
-                words = [
-                    word.rstrip() for word in line.split(" ") if len(word.rstrip()) > 0
-                ]
-                for i in range(1, len(words)):
-                    add.append(Proposition(words[i]))
-                line = f.readline()
-                words = [
-                    word.rstrip() for word in line.split(" ") if len(word.rstrip()) > 0
-                ]
-                for i in range(1, len(words)):
-                    delete.append(Proposition(words[i]))
-                act = Action(name, precond, add, delete)
-                for prop in add:
-                    self.find_prop_by_name(prop, propositions).add_producer(act)
-                actions.append(act)
-            line = f.readline()
+                precond = next(lines).split()[1:]
+                add = next(lines).split()[1:]
+                delete = next(lines).split()[1:]
+                yield name, precond, add, delete
+            elif len(words) > 0 and words[0] == "Group:" and groups is not None:
+                groups.append(words[1:])
+
+    def get_mutex_groups(self):
+        """
+        Returns the invariant groups of the domain as lists of propositions,
+        must be called after parse_actions_and_propositions
+        """
+        return [self.find_props_by_name(names) for names in self.group_names]
 
-        for a in actions:
-            new_pre = [p for p in propositions if p.name in [q.name for q in a.pre]]
-            new_add = [p for p in propositions if p.name in [q.name for q in a.add]]
-            new_delete = [
-                p for p in propositions if p.name in [q.name for q in a.delete]
-            ]
-            a.pre = new_pre
-            a.add = new_add
-            a.delete = new_delete
+    def build_domain(self, proposition_names, actions):
+        """
+        Returns the list of the actions and the list of the propositions of the domain.
+        Every proposition and every action gets a dense integer index, and the pre/add/delete
+        lists of the actions are compiled into bitsets. The lists of an action only hold the
+        propositions of the domain, in the order they are declared.
+        """
+        propositions = []
+        for name in proposition_names:
+            if name not in self.propositions_by_name:
+                prop = Proposition(name, len(propositions))
+                self.propositions_by_name[name] = prop
+                propositions.append(prop)
+        result = []
+        for name, precond, add, delete in actions:
+            act = Action(
+                name,
+                self.find_props_by_name(precond),
+                self.find_props_by_name(add),
+                self.find_props_by_name(delete),
+                False,
+                len(result),
+            )
+            act.update_masks()
+            for prop in act.get_add():
+                prop.add_producer(act)
+            result.append(act)
+        return [result, propositions]
 
-        return [actions, propositions]
+    def find_props_by_name(self, names):
+        """
+        Returns the propositions of the domain with the given names in declaration order,
+        the names that are not in the domain are dropped
+        """
+        props = {
+            self.propositions_by_name[name]
+            for name in names
+            if name in self.propositions_by_name
+        }
+        return sorted(props, key=lambda prop: prop.index)
 
-    @staticmethod
-    def find_prop_by_name(name, propositions):
-        for prop in propositions:
-            if prop == name:
-                return prop
+    def get_proposition(self, name):
+        """
+        Returns the interned proposition with the given name,
+        propositions that are not in the domain are interned with a new index
+        """
+        prop = self.propositions_by_name.get(name)
+        if prop is None:
+            prop = Proposition(name, len(self.propositions_by_name))
+            self.propositions_by_name[name] = prop
+        return prop
 
     def parse_problem(self):
-        init = []
-        goal = []
-        f = open(self.problem_file, "r")
-        line = f.readline()
-        words = [word.rstrip() for word in line.split(" ") if len(word.rstrip()) > 0]
-        for i in range(2, len(words)):
-            init.append(Proposition(words[i]))
-        line = f.readline()
-        words = [word.rstrip() for word in line.split(" ") if len(word.rstrip()) > 0]
-        for i in range(2, len(words)):
-            goal.append(Proposition(words[i]))
+        if not isinstance(self.problem_file, str):
+            initial_state, goal_state = self.problem_file
+        else:
+            with open(self.problem_file, "r") as f:
+                initial_state = f.readline().split()[2:]
+                goal_state = f.readline().split()[2:]
+        init = [self.get_proposition(name) for name in initial_state]
+        goal = [self.get_proposition(name) for name in goal_state]
         return init, goal
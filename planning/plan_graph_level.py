@@ -1,39 +1,87 @@
+from collections import defaultdict
+
 from planning.action_layer import ActionLayer
-from planning.util import Pair
-from planning.proposition import Proposition
+from planning.util import Pair, iter_bits
 from planning.proposition_layer import PropositionLayer
+from planning.budget import check_budget
+from planning.memory import measure
+from planning.stats import phase
+
+MUTEX_MODES = ("pairs", "bitset", "numpy")
+# how the mutex relations of a level are computed:
+# "pairs" checks every pair of actions / propositions with the functions at the bottom of this file,
+# "bitset" computes whole rows of the mutex matrices with bit-parallel operations on int bitsets,
+# "numpy" computes the mutex matrices with boolean matrix products (requires numpy)
 
 
 class PlanGraphLevel(object):
     """
     A class for representing a level in the plan graph.
     For each level i, the PlanGraphLevel consists of the actionLayer and propositionLayer at this level in this order!
+    NoOps are not materialized as actions: every proposition of the previous proposition layer persists,
+    and the mutexes of its noOp are derived from the previous proposition mutexes (see compute_mutex_row).
     """
 
-    independent_actions = (
-        set()
-    )  # updated to the independent_actions of the problem (graph_plan.py line 32)
+    interference = []  # updated to the static interference table of the problem (see GraphPlan.independent)
+    static_mutex = []  # updated to the static mutex table of the propositions (see compiled_domain.static_mutex_table)
     actions = []  # updated to the actions of the problem (graph_plan.py line 33 and planning_problem.py line 36)
     props = []  # updated to the propositions of the problem (graph_plan.py line 34 and planning_problem.py line 36)
+    consumers = dict()  # proposition index -> actions that have it as a precondition (see set_actions)
+    deleters = dict()  # proposition index -> bitset of the actions that delete it (see set_actions)
+    mutex_mode = "bitset"  # one of MUTEX_MODES
+
+    @staticmethod
+    def set_interference(interference):
+        PlanGraphLevel.interference = interference
+
+    @staticmethod
+    def set_static_mutex(static_mutex):
+        PlanGraphLevel.static_mutex = static_mutex
 
     @staticmethod
-    def set_independent_actions(independent_actions):
-        PlanGraphLevel.independent_actions = independent_actions
+    def get_static_mutex(index):
+        # returns the bitset of the propositions that are mutex with the proposition with index in every level
+        if index < len(PlanGraphLevel.static_mutex):
+            return PlanGraphLevel.static_mutex[index]
+        return 0
 
     @staticmethod
     def set_actions(actions):
         PlanGraphLevel.actions = actions
+        PlanGraphLevel.consumers = defaultdict(list)
+        PlanGraphLevel.deleters = defaultdict(int)
+        for action in actions:
+            for prop in action.get_pre():
+                PlanGraphLevel.consumers[prop.index].append(action)
+            for prop in action.get_delete():
+                PlanGraphLevel.deleters[prop.index] |= 1 << action.index
 
     @staticmethod
     def set_props(props):
         PlanGraphLevel.props = props
 
+    @staticmethod
+    def set_mutex_mode(mode):
+        if mode not in MUTEX_MODES:
+            raise ValueError(
+                "unknown mutex mode %r, expected one of %s" % (mode, ", ".join(MUTEX_MODES))
+            )
+        if mode == "numpy":
+            from planning.numpy_mutex import require_numpy
+
+            require_numpy()
+        PlanGraphLevel.mutex_mode = mode
+
     def __init__(self):
         """
         Constructor
         """
         self.action_layer = ActionLayer()  # see action_layer.py
         self.proposition_layer = PropositionLayer()  # see proposition_layer.py
+        self.previous_proposition_layer = None  # the propositions that persist to this level (implicit noOps)
+        self.mutex_rows = dict()  # cache of get_mutex_row, filled during plan extraction
+        self.new_actions = 0  # bitset of the actions that are not in the previous action layer
+        self.changed_actions = 0  # bitset of the new actions and of the old actions whose mutexes changed
 
     def get_proposition_layer(self):  # returns the proposition layer
         return self.proposition_layer
@@ -47,29 +95,111 @@ class PlanGraphLevel(object):
     def set_action_layer(self, action_layer):  # sets the action layer
         self.action_layer = action_layer
 
-    def update_action_layer(self, previous_proposition_layer):
+    def get_persisting(self):  # returns the bitset of the propositions that have a noOp in this level
+        if self.previous_proposition_layer is None:
+            return 0
+        return self.previous_proposition_layer.get_mask()
+
+    def has_noop(self, prop):  # returns true if the proposition prop persists from the previous level
+        return (self.get_persisting() >> prop.index) & 1 == 1
+
+    def get_mutex_row(self, index):
+        # returns compute_mutex_row(index), cached once the level is expanded
+        row = self.mutex_rows.get(index)
+        if row is None:
+            row = self.compute_mutex_row(index)
+            self.mutex_rows[index] = row
+        return row
+
+    def compute_mutex_row(self, index):
+        """
+        Returns the mutex row of an action of the level over the actions and the noOps,
+        where the noOp of the proposition with index p has the index len(PlanGraphLevel.actions) + p.
+        The noOp of p interferes with the actions that delete p, and has competing needs with the
+        actions and the noOps whose preconditions are mutex with p in the previous proposition layer.
+        """
+        n_actions = len(PlanGraphLevel.actions)
+        persisting = self.get_persisting()
+        if not persisting:
+            return self.action_layer.get_mutex_actions().get_row(index)
+        previous_mutex = self.previous_proposition_layer.get_mutex_props()
+        if index < n_actions:
+            action = PlanGraphLevel.actions[index]
+            noops = action.del_mask
+            for prop in action.get_pre():
+                noops |= previous_mutex.get_row(prop.index)
+            row = self.action_layer.get_mutex_actions().get_row(index)
+            return row | (noops & persisting) << n_actions
+        prop_index = index - n_actions
+        if not (persisting >> prop_index) & 1:
+            return 0
+        needs = previous_mutex.get_row(prop_index)
+        row = PlanGraphLevel.deleters.get(prop_index, 0)
+        for other in iter_bits(needs):
+            row |= self.action_layer.pre_index.get(other, 0)
+        return row & self.action_layer.get_mask() | needs << n_actions
+
+    def noops_mutex(self, prop1, prop2):
+        """
+        Returns true if all the pairs of producers of prop1 and prop2 that involve a noOp are mutex
+        (the pairs of actions are checked by mutex_propositions), see mutex_noop
+        """
+        previous_layer = self.previous_proposition_layer
+        if previous_layer is None:
+            return True
+        persist1 = previous_layer.contains(prop1)
+        persist2 = previous_layer.contains(prop2)
+        if persist1 and persist2 and not previous_layer.is_mutex(prop1, prop2):
+            return False
+        for prop, persists, other in ((prop1, persist1, prop2), (prop2, persist2, prop1)):
+            if persists:
+                for action in self.get_producers(other):
+                    if not mutex_noop(action, prop, previous_layer):
+                        return False
+        return True
+
+    def update_action_layer(self, previous_proposition_layer, previous_action_layer=None):
         """
         Updates the action layer given the previous proposition layer (see proposition_layer.py)
         You should add an action to the layer if its preconditions are in the previous propositions layer,
         and the preconditions are not pairwise mutex.
-        all_actions is the set of all the action (include noOp) in the domain
+        all_actions is the set of all the action (noOps are implicit, see get_mutex_row) in the domain
         You might want to use those functions:
         previous_proposition_layer.is_mutex(prop1, prop2) returns true
         if prop1 and prop2 are mutex at the previous propositions layer
         previous_proposition_layer.all_preconds_in_layer(action) returns true
         if all the preconditions of action are in the previous propositions layer
         self.actionLayer.addAction(action) adds action to the current action layer
+        When the previous action layer is given, the layer is built incrementally:
+        it starts from the actions of the previous layer, and only the actions that require
+        a proposition that changed in the previous proposition layer are checked.
         """
         all_actions = PlanGraphLevel.actions
+        self.previous_proposition_layer = previous_proposition_layer
         "*** YOUR CODE HERE ***"
+        if previous_action_layer is not None and previous_action_layer.get_mask():
+            self.action_layer.share_actions_of(previous_action_layer)
+            seen = previous_action_layer.get_mask()
+            all_actions = []
+            for index in iter_bits(previous_proposition_layer.get_changed_mask()):
+                for action in PlanGraphLevel.consumers.get(index, ()):
+                    if not (seen >> action.index) & 1:
+                        seen |= 1 << action.index
+                        all_actions.append(action)
         for action in all_actions:
             if previous_proposition_layer.all_preconds_in_layer(action):
-                for prop1 in action.get_pre():
-                    for prop2 in action.get_pre():
-                        if not previous_proposition_layer.is_mutex(prop1, prop2):
-                            self.action_layer.add_action(action)
+                self.action_layer.add_action(action)
+        if previous_action_layer is None:
+            self.new_actions = self.action_layer.get_mask()
+        else:
+            self.new_actions = self.action_layer.get_mask() & ~previous_action_layer.get_mask()
 
-    def update_mutex_actions(self, previous_layer_mutex_proposition):
+    def update_mutex_actions(
+        self,
+        previous_layer_mutex_proposition,
+        previous_action_layer=None,
+        changed_propositions=0,
+    ):
         """
         Updates the mutex set in self.action_layer,
         given the mutex proposition from the previous layer.
@@ -78,9 +208,30 @@ class PlanGraphLevel(object):
         self.actionLayer.add_mutex_actions(action1, action2)
         adds the pair (action1, action2) to the mutex set in the current action layer
         Note that an action is *not* mutex with itself
+        In the bitset mode, the mutexes are updated incrementally from the previous action layer
+        (when given), changed_propositions is the changed mask of the previous proposition layer.
         """
         current_layer_actions = self.action_layer.get_actions()
+        self.changed_actions = self.action_layer.get_mask()
         "*** YOUR CODE HERE ***"
+        if PlanGraphLevel.mutex_mode == "bitset":
+            self.update_mutex_actions_bitset(
+                previous_layer_mutex_proposition,
+                previous_action_layer,
+                changed_propositions,
+            )
+            return
+        if PlanGraphLevel.mutex_mode == "numpy":
+            from planning.numpy_mutex import action_mutex_rows
+
+            rows = action_mutex_rows(
+                current_layer_actions,
+                previous_layer_mutex_proposition.get_rows(),
+                len(PlanGraphLevel.actions),
+                len(PlanGraphLevel.props),
+            )
+            self.action_layer.get_mutex_actions().set_rows(rows, PlanGraphLevel.actions)
+            return
         for action1 in current_layer_actions:
             for action2 in current_layer_actions:
                 if action1 == action2:
@@ -88,57 +239,213 @@ class PlanGraphLevel(object):
                 if mutex_actions(action1, action2, previous_layer_mutex_proposition):
                     self.action_layer.add_mutex_actions(action1, action2)
 
-    def update_proposition_layer(self):
+    def update_mutex_actions_bitset(
+        self,
+        previous_layer_mutex_proposition,
+        previous_action_layer=None,
+        changed_propositions=0,
+    ):
+        """
+        Computes the rows of the action mutex matrix of the current layer with bitsets.
+        Interference is read from the static interference table restricted to the layer,
+        and competing needs is Pre x MutexProps x Pre^T: the propositions that are mutex
+        with a precondition of an action are gathered with one OR per precondition,
+        and mapped back to the actions that require them.
+        Only the rows of the dirty actions are computed: the new actions and the old ones
+        that require a changed proposition. Two clean actions keep the status they had in
+        the previous layer, so the mutex set is stored as a delta of the previous one
+        holding the dirty rows and the clean rows patched with the dirty columns.
+        """
+        layer_actions = self.action_layer.get_mask()
+        pre_index = self.action_layer.pre_index
+        previous_mutex = None
+        old_actions = 0
+        dirty = layer_actions
+        if previous_action_layer is not None and previous_action_layer.get_mask():
+            previous_mutex = previous_action_layer.get_mutex_actions()
+            old_actions = previous_action_layer.get_mask()
+            dirty = layer_actions & ~old_actions
+            for index in iter_bits(changed_propositions):
+                dirty |= pre_index.get(index, 0) & old_actions
+
+        rows = dict()
+        changed = layer_actions & ~old_actions
+        for index in iter_bits(dirty):
+            action = PlanGraphLevel.actions[index]
+            row = PlanGraphLevel.interference[index] & layer_actions
+            needs = 0
+            for prop in action.get_pre():
+                needs |= previous_layer_mutex_proposition.get_row(prop.index)
+            for prop_index in iter_bits(needs):
+                row |= pre_index.get(prop_index, 0)
+            row &= ~(1 << index)
+            rows[index] = row
+            if previous_mutex is not None and row & old_actions != previous_mutex.get_row(index):
+                changed |= 1 << index
+        self.changed_actions = changed
+
+        if previous_mutex is None:
+            self.action_layer.get_mutex_actions().set_rows(rows, PlanGraphLevel.actions)
+            return
+        self.patch_clean_rows(rows, dirty, layer_actions & ~dirty, previous_mutex)
+        self.action_layer.get_mutex_actions().set_delta_rows(
+            rows, previous_mutex, PlanGraphLevel.actions
+        )
+
+    @staticmethod
+    def patch_clean_rows(rows, dirty, clean, previous_mutex):
+        """
+        Adds to rows (which holds the rows of the dirty indices) the clean rows that
+        changed: the clean rows of the previous mutex set lose their dirty columns,
+        which are then set from the dirty rows (the matrices are symmetric)
+        """
+        for index in iter_bits(dirty):
+            bit = 1 << index
+            row = rows[index]
+            for other in iter_bits((previous_mutex.get_row(index) | row) & clean):
+                if other not in rows:
+                    rows[other] = previous_mutex.get_row(other) & ~dirty
+                if (row >> other) & 1:
+                    rows[other] |= bit
+
+    def update_proposition_layer(self, previous_proposition_layer=None):
         """
         Updates the propositions in the current proposition layer,
         given the current action layer.
-        don't forget to update the producers list!
-        Note that same proposition in different layers might have different producers lists,
-        hence you should create two different instances.
+        The propositions are the interned ones of the problem, shared by all the layers:
+        the producers of a proposition in this layer are read from the action layer (see get_producers).
         current_layer_actions is the set of all the actions in the current layer.
         You might want to use those functions:
-        dict() creates a new dictionary that might help to keep track on the propositions that you've
-               already added to the layer
         self.proposition_layer.add_proposition(prop) adds the proposition prop to the current layer
-
+        The propositions of the previous level persist (implicit noOps), so the layer starts
+        from the propositions of the previous layer (shared until modified),
+        and only the new actions of the layer are scanned.
         """
         current_layer_actions = self.action_layer.get_actions()
+        if previous_proposition_layer is None:
+            previous_proposition_layer = self.previous_proposition_layer
         "*** YOUR CODE HERE ***"
-        new_props = dict()
+        if previous_proposition_layer is not None:
+            self.proposition_layer.share_propositions_of(previous_proposition_layer)
+            current_layer_actions = [
+                PlanGraphLevel.actions[index] for index in iter_bits(self.new_actions)
+            ]
         for action in current_layer_actions:
-            for potentioal_prop in action.get_add():
-                if potentioal_prop.get_name() not in new_props.keys():
-                    temp_prop = Proposition(potentioal_prop.get_name())
-                    temp_prop.add_producer(action)
-                    new_props[potentioal_prop.get_name()] = temp_prop
-                else:
-                    temp_prop = new_props[potentioal_prop.get_name()]
-                    new_props[potentioal_prop.get_name()].add_producer(action)
-                    new_props[potentioal_prop.get_name()] = temp_prop
+            for prop in action.get_add():
+                if not self.proposition_layer.contains(prop):
+                    self.proposition_layer.add_proposition(prop)
 
-        for _, value in new_props.items():
-            self.proposition_layer.add_proposition(value)
+    def get_producers(self, prop):
+        # returns the list of the actions of the layer that have prop in their add list
+        return [
+            PlanGraphLevel.actions[index]
+            for index in iter_bits(self.action_layer.get_producers(prop))
+        ]
 
-    def update_mutex_proposition(self):
+    def update_mutex_proposition(self, previous_proposition_layer=None):
         """
         updates the mutex propositions in the current proposition layer
         You might want to use those functions:
-        mutex_propositions(prop1, prop2, current_layer_mutex_actions) returns true
-        if prop1 and prop2 are mutex in the current layer
+        mutex_propositions(producers1, producers2, current_layer_mutex_actions) returns true
+        if all the producers of prop1 are mutex with all the producers of prop2 in the current layer
         self.proposition_layer.add_mutex_prop(prop1, prop2) adds the pair (prop1, prop2)
         to the mutex set of the current layer
+        The pairs of producers that involve the noOps are checked by noops_mutex.
+        In the bitset mode, the mutexes are updated incrementally from the previous proposition layer
+        (when given).
         """
         current_layer_propositions = self.proposition_layer.get_propositions()
         current_layer_mutex_actions = self.action_layer.get_mutex_actions()
         "*** YOUR CODE HERE ***"
+        if PlanGraphLevel.mutex_mode == "bitset":
+            self.update_mutex_proposition_bitset(previous_proposition_layer)
+            return
+        if PlanGraphLevel.mutex_mode == "numpy":
+            from planning.numpy_mutex import proposition_mutex_rows
+
+            n_actions = len(PlanGraphLevel.actions)
+            persisting = self.get_persisting()
+            producers = self.action_layer.get_mask() | persisting << n_actions
+            rows = proposition_mutex_rows(
+                current_layer_propositions,
+                self.action_layer.get_producers,
+                {index: self.compute_mutex_row(index) for index in iter_bits(producers)},
+                n_actions,
+                len(PlanGraphLevel.props),
+                persisting,
+            )
+            layer_propositions = self.proposition_layer.get_mask()
+            for index in rows:
+                rows[index] |= PlanGraphLevel.get_static_mutex(index) & layer_propositions
+            self.proposition_layer.get_mutex_props().set_rows(rows, PlanGraphLevel.props)
+            return
+        producers = {prop: self.get_producers(prop) for prop in current_layer_propositions}
         for prop1 in current_layer_propositions:
             for prop2 in current_layer_propositions:
                 if prop1 == prop2:
                     continue
-                if mutex_propositions(prop1, prop2, current_layer_mutex_actions):
+                if (PlanGraphLevel.get_static_mutex(prop1.index) >> prop2.index) & 1:
+                    self.proposition_layer.add_mutex_prop(prop1, prop2)
+                    continue
+                if mutex_propositions(
+                    producers[prop1], producers[prop2], current_layer_mutex_actions
+                ) and self.noops_mutex(prop1, prop2):
                     self.proposition_layer.add_mutex_prop(prop1, prop2)
 
-    def expand(self, previous_layer):
+    def update_mutex_proposition_bitset(self, previous_proposition_layer=None):
+        """
+        Computes the rows of the proposition mutex matrix of the current layer with bitsets.
+        For every proposition we AND the mutex rows of its producers (noOp included, see compute_mutex_row),
+        which gives the actions that are mutex with all of its producers. Two propositions are then
+        mutex iff all the producers of one of them are in that set of the other one.
+        Only the rows of the dirty propositions are computed: the ones produced by an action
+        that is new or whose mutexes changed, and the ones whose noOp changed (the changed
+        propositions of the previous layer). The mutex set is stored as a delta of the
+        previous one, holding the dirty rows and the clean rows patched with the dirty columns.
+        The static mutexes are seeded in the rows, and only the other pairs are checked.
+        """
+        current_layer_propositions = self.proposition_layer.get_propositions()
+        layer_propositions = self.proposition_layer.get_mask()
+        n_actions = len(PlanGraphLevel.actions)
+        persisting = self.get_persisting()
+        layer_producers = self.action_layer.get_mask() | persisting << n_actions
+        previous_mutex = None
+        dirty = layer_propositions
+        if previous_proposition_layer is not None:
+            previous_mutex = previous_proposition_layer.get_mutex_props()
+            dirty = previous_proposition_layer.get_changed_mask()
+            for index in iter_bits(self.changed_actions):
+                dirty |= PlanGraphLevel.actions[index].add_mask
+            dirty &= layer_propositions
+
+        producers = dict()  # proposition -> bitset of its producers
+        mutex_with_all = dict()  # dirty proposition -> actions mutex with all of its producers
+        for prop in current_layer_propositions:
+            producers[prop.index] = self.action_layer.get_producers(prop)
+            if (persisting >> prop.index) & 1:
+                producers[prop.index] |= 1 << (n_actions + prop.index)
+            if (dirty >> prop.index) & 1:
+                common = layer_producers
+                for producer in iter_bits(producers[prop.index]):
+                    common &= self.compute_mutex_row(producer)
+                mutex_with_all[prop.index] = common
+
+        rows = dict()
+        for prop1, common in mutex_with_all.items():
+            row = PlanGraphLevel.get_static_mutex(prop1) & layer_propositions
+            for prop2 in iter_bits(layer_propositions & ~row & ~(1 << prop1)):
+                if producers[prop2] & ~common == 0:
+                    row |= 1 << prop2
+            rows[prop1] = row
+        if previous_mutex is None:
+            self.proposition_layer.get_mutex_props().set_rows(rows, PlanGraphLevel.props)
+            return
+        self.patch_clean_rows(rows, dirty, layer_propositions & ~dirty, previous_mutex)
+        self.proposition_layer.get_mutex_props().set_delta_rows(
+            rows, previous_mutex, PlanGraphLevel.props
+        )
+
+    def expand(self, previous_layer, stats=None, budget=None, memory=None):
         """
         Your algorithm should work as follows:
         First, given the propositions and the list of mutex propositions from the previous layer,
@@ -146,15 +453,42 @@ class PlanGraphLevel(object):
         Then, set the mutex action in the action layer.
         Finally, given all the actions in the current layer,
         set the propositions and their mutex relations in the proposition layer.
+        Since the planning graph is monotonic, every step starts from the state of the previous
+        level and only looks at what changed (see PropositionLayer.set_delta).
+        When stats is given (see stats.PlanStats), the time spent in each step is recorded there.
+        When budget is given (see budget.Budget), it is checked before each step, and the expansion
+        raises budget.BudgetExceeded once it runs out.
+        When memory is given (see memory.MemoryTracker), the memory allocated by each step is recorded there.
         """
         previous_proposition_layer = previous_layer.get_proposition_layer()
         previous_layer_mutex_proposition = previous_proposition_layer.get_mutex_props()
+        previous_action_layer = previous_layer.get_action_layer()
 
         "*** YOUR CODE HERE ***"
-        self.update_action_layer(previous_proposition_layer)
-        self.update_mutex_actions(previous_layer_mutex_proposition)
-        self.update_proposition_layer()
-        self.update_mutex_proposition()
+        check_budget(budget)
+        with phase(stats, "update_action_layer"), measure(memory, "layers"):
+            self.update_action_layer(previous_proposition_layer, previous_action_layer)
+        check_budget(budget)
+        with phase(stats, "update_mutex_actions"), measure(memory, "mutexes"):
+            self.update_mutex_actions(
+                previous_layer_mutex_proposition,
+                previous_action_layer,
+                previous_proposition_layer.get_changed_mask(),
+            )
+        if not self.changed_actions and not previous_proposition_layer.get_changed_mask():
+            # same actions, action mutexes and noOps as the previous level, hence the same propositions:
+            # the graph leveled off and this level is just a reference to the previous one
+            self.action_layer = previous_action_layer
+            self.proposition_layer = previous_proposition_layer
+            self.mutex_rows = previous_layer.mutex_rows
+            return
+        check_budget(budget)
+        with phase(stats, "update_proposition_layer"), measure(memory, "layers"):
+            self.update_proposition_layer(previous_proposition_layer)
+        check_budget(budget)
+        with phase(stats, "update_mutex_proposition"), measure(memory, "mutexes"):
+            self.update_mutex_proposition(previous_proposition_layer)
+            self.proposition_layer.set_delta(previous_proposition_layer)
 
     def expand_without_mutex(self, previous_layer):
         """
@@ -170,11 +504,11 @@ class PlanGraphLevel(object):
 def mutex_actions(a1, a2, mutex_props):
     """
     This function returns true if a1 and a2 are mutex actions.
-    We first check whether a1 and a2 are in PlanGraphLevel.independent_actions,
-    this is the list of all the independent pair of actions (according to your implementation in question 1).
+    We first check whether a1 and a2 interfere according to PlanGraphLevel.interference,
+    the static table of the actions that are not independent (see GraphPlan.independent).
     If not, we check whether a1 and a2 have competing needs
     """
-    if Pair(a1, a2) not in PlanGraphLevel.independent_actions:
+    if (PlanGraphLevel.interference[a1.index] >> a2.index) & 1:
         return True
     return have_competing_needs(a1, a2, mutex_props)
 
@@ -195,17 +529,30 @@ def have_competing_needs(a1, a2, mutex_props):
     return False
 
 
-def mutex_propositions(prop1, prop2, mutex_actions_list):
+def mutex_propositions(producers1, producers2, mutex_actions_list):
     """
     complete code for deciding whether two propositions are mutex,
     given the mutex action from the current level (set of pairs of actions).
     Your update_mutex_proposition function should call this function
-    You might want to use this function:
-    prop1.get_producers() returns the set of all the possible actions in the layer that have prop1 on their add list
+    producers1 and producers2 are the actions of the layer that have the propositions
+    on their add list (see PlanGraphLevel.get_producers)
     """
     "*** YOUR CODE HERE ***"
-    for action1 in prop1.get_producers():
-        for action2 in prop2.get_producers():
+    for action1 in producers1:
+        for action2 in producers2:
             if Pair(action1, action2) not in mutex_actions_list:
                 return False
     return True
+
+
+def mutex_noop(action, prop, previous_layer):
+    """
+    Returns true if the action is mutex with the noOp of prop: the action deletes prop (interference),
+    or one of its preconditions is mutex with prop in the previous proposition layer (competing needs)
+    """
+    if action.is_neg_effect(prop):
+        return True
+    for pre in action.get_pre():
+        if previous_layer.is_mutex(pre, prop):
+            return True
+    return False
@@ -2,20 +2,30 @@ class Proposition(object):
     """
     A class for representing propositions.
     Each proposition object has a name and a list of producers,
-    that is the actions that have the proposition on their add set.
+    that is the actions of the domain that have the proposition on their add set.
     Two propositions are considered equal if they have the same name.
+    Once the problem is parsed every proposition gets a dense integer index,
+    which is its bit in the bitsets used by actions and proposition layers.
+    A proposition is a single object shared by all the layers of the plan graph,
+    its producers in a layer are kept by the action layer (see ActionLayer.get_producers).
     """
 
-    def __init__(self, name):
+    __slots__ = ("name", "index", "producers")
+
+    def __init__(self, name, index=None):
         """
         Constructor
         """
         self.name = name  # the name of the proposition as string
-        self.producers = []  # list of all possible actions in the layer that have the proposition on their add list
+        self.index = index  # the dense integer id of the proposition (set by the parser)
+        self.producers = []  # list of all the actions of the domain that have the proposition on their add list
 
     def get_name(self):
         return self.name
 
+    def get_index(self):
+        return self.index
+
     def get_producers(self):
         return self.producers
 
@@ -1,10 +1,12 @@
-from planning.util import Pair
+from planning.util import Pair, MutexSet
 
 
 class PropositionLayer(object):
     """
     A class for an PropositionLayer  in a level of the graph.
     The layer contains a set of propositions (Proposition objects) and a set of mutex propositions (Pair objects)
+    The propositions are also kept as an int bitset over their indices (mask),
+    and the mutex propositions as a bit-packed matrix over the same indices (see util.MutexSet)
     """
 
     def __init__(self):
@@ -13,21 +15,78 @@ class PropositionLayer(object):
         """
         self.propositions = set()
         # set of all the propositions in the layer
-        self.mutexPropositions = set()
+        self.shared = False
+        # true while propositions is shared with another layer
+        self.mask = 0
+        # bitset of the indices of all the propositions in the layer
+        self.changed_mask = None
+        # bitset of the propositions that are new in this layer or whose mutexes
+        # with the propositions of the previous layer changed, None if unknown (see set_delta)
+        self.mutexPropositions = MutexSet()
         # set of pairs of propositions that are mutex in the layer
 
     def add_proposition(self, proposition):
-        # adds proposition to the propositions set
+        # adds proposition to the propositions set (replacing the object with the same name, if any)
+        self.unshare()
+        self.propositions.discard(proposition)
         self.propositions.add(proposition)
+        self.mask |= 1 << proposition.index
 
     def remove_propositions(self, proposition):
         # remove proposition from the propositions set
+        self.unshare()
         self.propositions.remove(proposition)
+        self.mask &= ~(1 << proposition.index)
+
+    def share_propositions_of(self, other):
+        # makes the layer contain the propositions of other, shared until this layer is modified
+        self.propositions = other.propositions
+        self.mask = other.mask
+        self.shared = True
+
+    def unshare(self):
+        # copies the shared structures before they are modified
+        if self.shared:
+            self.propositions = set(self.propositions)
+            self.shared = False
 
     def get_propositions(self):
         # returns the propositions set
         return self.propositions
 
+    def get_mask(self):
+        # returns the propositions bitset
+        return self.mask
+
+    def get_changed_mask(self):
+        # returns the bitset of the changed propositions, when unknown all of them are considered changed
+        if self.changed_mask is None:
+            return self.mask
+        return self.changed_mask
+
+    def set_delta(self, previous_layer):
+        """
+        Records which propositions changed with respect to the previous proposition layer:
+        the new ones, and the old ones whose mutex row restricted to the old propositions changed.
+        Since the planning graph is monotonic, the actions of the next level whose
+        preconditions are all unchanged keep the status they had at this level
+        """
+        old = previous_layer.get_mask()
+        previous_mutex = previous_layer.get_mutex_props()
+        if self.mutexPropositions.is_delta_of(previous_mutex):
+            rows = self.mutexPropositions.get_delta()  # only these rows can differ
+        else:
+            rows = self.mutexPropositions.get_rows()
+        changed = self.mask & ~old
+        for index, row in rows.items():
+            if (old >> index) & 1 and row & old != previous_mutex.get_row(index):
+                changed |= 1 << index
+        self.changed_mask = changed
+
+    def contains(self, proposition):
+        # returns true if the proposition is in the layer
+        return (self.mask >> proposition.index) & 1 == 1
+
     def add_mutex_prop(self, p1, p2):
         # adds the pair(p1,p2) to the mutex propositions set
         self.mutexPropositions.add(Pair(p1, p2))
@@ -47,17 +106,12 @@ class PropositionLayer(object):
         returns true if all propositions that are preconditions of the
         action exist in this layer (i.e. the action can be applied)
         """
-        action_pre = action.get_pre()
-        for pre in action_pre:
-            if pre not in self.propositions:
-                return False
+        if action.pre_mask & ~self.mask:
+            return False
 
-        for i in range(len(action_pre)):
-            for j in range(i + 1, len(action_pre)):
-                pre1 = action_pre[i]
-                pre2 = action_pre[j]
-                if Pair(pre1, pre2) in self.mutexPropositions:
-                    return False
+        for pre in action.get_pre():
+            if self.mutexPropositions.get_row(pre.index) & action.pre_mask:
+                return False
 
         return True
 
@@ -0,0 +1,60 @@
+"""
+Reachability and relevance analysis of a planning problem, used to drop the propositions and the
+actions that cannot take part in a plan before the planning graph is built (see CompiledDomain.prune).
+Both analyses ignore the delete lists (relaxed problem), so they only drop what no plan can use:
+- a proposition is reachable if it is in the initial state or added by a reachable action,
+  an action is reachable if all its preconditions are reachable,
+- a proposition is relevant if it is a goal or a precondition of a relevant action,
+  an action is relevant if it is reachable and adds a relevant proposition.
+"""
+
+from planning.util import to_mask
+
+
+def reachable(actions, initial_state):
+    """
+    Returns the bitset of the reachable propositions and the list of the reachable actions
+    """
+    facts = to_mask(initial_state)
+    remaining = actions
+    result = []
+    while True:
+        applicable = [act for act in remaining if act.pre_mask & ~facts == 0]
+        if len(applicable) == 0:
+            break
+        remaining = [act for act in remaining if act.pre_mask & ~facts]
+        for act in applicable:
+            facts |= act.add_mask
+        result.extend(applicable)
+    result.sort(key=lambda act: act.index)
+    return facts, result
+
+
+def relevant(actions, goal):
+    """
+    Returns the bitset of the relevant propositions and the list of the relevant actions among actions
+    (the reachable ones)
+    """
+    facts = to_mask(goal)
+    remaining = actions
+    result = []
+    while True:
+        producers = [act for act in remaining if act.add_mask & facts]
+        if len(producers) == 0:
+            break
+        remaining = [act for act in remaining if act.add_mask & facts == 0]
+        for act in producers:
+            facts |= act.pre_mask
+        result.extend(producers)
+    result.sort(key=lambda act: act.index)
+    return facts, result
+
+
+def useful_part(actions, initial_state, goal):
+    """
+    Returns the bitset of the propositions and the list of the actions that are both reachable
+    and relevant, the goal propositions are always kept
+    """
+    reachable_facts, reachable_actions = reachable(actions, initial_state)
+    relevant_facts, relevant_actions = relevant(reachable_actions, goal)
+    return (reachable_facts & relevant_facts) | to_mask(goal), relevant_actions
@@ -1,59 +1,124 @@
-def create_move(car_name, direction, old_start_x, old_start_y, new_end_x, new_end_y):
+import os
+
+from planning.compiled_domain import CompiledDomain, board_key, load_or_compile
+
+ENCODINGS = ("ends", "compact")
+# how the position of a car is encoded in the domain:
+# "ends" has a proposition for each end of the car ({car}_left_x_y and {car}_right_x_y, or _up_ and _down_),
+# "compact" has a single proposition {car}_at_x_y for its left (top) square
+
+
+def check_encoding(encoding):
+    if encoding not in ENCODINGS:
+        raise ValueError("unknown encoding %r, expected one of %s" % (encoding, ", ".join(ENCODINGS)))
+
+
+def check_max_steps(max_steps):
+    if not isinstance(max_steps, int) or max_steps < 1:
+        raise ValueError("max_steps must be a positive integer, got %r" % (max_steps,))
+
+
+def position_propositions(car_name, first, last, start_x, start_y, end_x, end_y, encoding="ends"):
+    # returns the names of the propositions that hold when the car has its left (top) end at (start_x, start_y)
+    # and its right (bottom) end at (end_x, end_y), first and last are "left" and "right" or "up" and "down"
+    if encoding == "compact":
+        return [f"{car_name}_at_{start_x}_{start_y}"]
+    return [f"{car_name}_{first}_{start_x}_{start_y}", f"{car_name}_{last}_{end_x}_{end_y}"]
+
+
+def format_move(name, pre, add, dell):
+    # returns the text of the move action in a domain file
+    return "\n".join(
+        [
+            "Name: " + name,
+            "pre: " + " ".join(pre),
+            "add: " + " ".join(add),
+            "del: " + " ".join(dell),
+        ]
+    )
+
+
+def create_move_lists(
+    car_name, direction, old_start_x, old_start_y, new_end_x, new_end_y, steps=1, encoding="ends"
+):
+    # returns the move action as a tuple (name, pre, add, del) of lists of proposition names,
+    # the car slides steps squares in direction, all the squares it passes over must be empty
     name = "%s_Move_%s_To_%s_%s" % (car_name, direction, new_end_x, new_end_y)
+    if steps > 1:
+        name += "_By_%d" % steps
 
     if direction == "right":
         opp_dir = "left"
-        new_start_x = old_start_x + 1
-        new_start_y = old_start_y
-        old_end_x = new_end_x - 1
-        old_end_y = new_end_y
+        dx, dy = 1, 0
 
     elif direction == "left":
         opp_dir = "right"
-        new_start_x = old_start_x - 1
-        new_start_y = old_start_y
-        old_end_x = new_end_x + 1
-        old_end_y = new_end_y
+        dx, dy = -1, 0
 
     elif direction == "up":
         opp_dir = "down"
-        new_start_x = old_start_x
-        new_start_y = old_start_y - 1
-        old_end_x = new_end_x
-        old_end_y = new_end_y + 1
+        dx, dy = 0, -1
 
     elif direction == "down":
         opp_dir = "up"
-        new_start_x = old_start_x
-        new_start_y = old_start_y + 1
-        old_end_x = new_end_x
-        old_end_y = new_end_y - 1
-
-    pre = [
-        f"{new_end_x}_{new_end_y}_empty",
-        f"{car_name}_{direction}_{old_end_x}_{old_end_y}",
-    ]
-
-    add = [
-        f"{old_start_x}_{old_start_y}_empty",
+        dx, dy = 0, 1
+
+    new_start_x = old_start_x + steps * dx
+    new_start_y = old_start_y + steps * dy
+    old_end_x = new_end_x - steps * dx
+    old_end_y = new_end_y - steps * dy
+    length = abs(old_end_x - old_start_x) + abs(old_end_y - old_start_y) + 1
+
+    def squares(x, y, count):
+        # the empty propositions of count squares from (x, y) in direction
+        return [f"{x + i * dx}_{y + i * dy}_empty" for i in range(count)]
+
+    passed = squares(old_end_x + dx, old_end_y + dy, steps)  # from the old end to the new end
+    vacated = squares(old_start_x, old_start_y, min(steps, length))
+    occupied = passed[-min(steps, length):]
+
+    if encoding == "compact":
+        # the position of the car is its left (top) square, which is the start of a move left (up)
+        old_x, old_y = min(old_start_x, old_end_x), min(old_start_y, old_end_y)
+        new_x, new_y = min(new_start_x, new_end_x), min(new_start_y, new_end_y)
+        pre = passed + [f"{car_name}_at_{old_x}_{old_y}"]
+        add = vacated + [f"{car_name}_at_{new_x}_{new_y}"]
+        dell = occupied + [f"{car_name}_at_{old_x}_{old_y}"]
+        return name, pre, add, dell
+
+    pre = passed + [f"{car_name}_{direction}_{old_end_x}_{old_end_y}"]
+
+    add = vacated + [
         f"{car_name}_{direction}_{new_end_x}_{new_end_y}",
         f"{car_name}_{opp_dir}_{new_start_x}_{new_start_y}",
     ]
 
-    dell = [
-        f"{new_end_x}_{new_end_y}_empty",
+    dell = occupied + [
         f"{car_name}_{direction}_{old_end_x}_{old_end_y}",
         f"{car_name}_{opp_dir}_{old_start_x}_{old_start_y}",
     ]
 
-    return "\n".join(
-        [
-            "Name: " + name,
-            "pre: " + " ".join(pre),
-            "add: " + " ".join(add),
-            "del: " + " ".join(dell),
-        ]
-    )
+    return name, pre, add, dell
+
+
+def read_board(lines):
+    """
+    Returns the rows of a board and its size (height, width) given the lines of a board file:
+    the first line is the size N of the (square) board, followed by its rows.
+    Missing rows and the missing end of short rows are empty squares.
+    Raises ValueError if the size line is missing or the rows do not fit in the board
+    """
+    lines = [line.rstrip() for line in lines]
+    if len(lines) == 0 or not lines[0].strip().isdigit():
+        raise ValueError("a board file starts with the size of the board")
+    size = int(lines[0])
+    rows = lines[1:]
+    while rows and not rows[-1]:
+        rows.pop()
+    if len(rows) > size or any(len(row) > size for row in rows):
+        raise ValueError("the rows of the board do not fit in its size %d" % size)
+    rows = [row.ljust(size, ".") for row in rows] + ["." * size] * (size - len(rows))
+    return rows, size, size
 
 
 def parse_vehicle_list(content):
@@ -106,9 +171,53 @@ def parse_vehicle_list(content):
     return main_vehicle, horizontal_vehicles, vertical_vehicles, empty_squares
 
 
+def relevant_vehicles(main_vehicle, horizontal_vehicles, vertical_vehicles):
+    """
+    Returns the horizontal and the vertical vehicles that can transitively block the main vehicle X.
+    A vehicle only ever occupies the squares of its lane (its row if it is horizontal, its column
+    if it is vertical), so a vehicle can block another one iff it currently stands on the lane of the
+    other one: X is relevant, and so is every vehicle that stands on the lane of a relevant vehicle.
+    The other vehicles never have to move and never stand in the way of a relevant vehicle,
+    so they can be left out of the problem with their squares occupied: the plans of the smaller
+    problem are plans of the full board, and the full board has a plan iff the smaller one has.
+    """
+    rows = {main_vehicle[0][1]}  # lanes of the relevant horizontal vehicles
+    columns = set()  # lanes of the relevant vertical vehicles
+    horizontal = list(horizontal_vehicles)
+    vertical = list(vertical_vehicles)
+    relevant_horizontal = []
+    relevant_vertical = []
+    changed = True
+    while changed:
+        changed = False
+        for car in list(horizontal):
+            name, (leftX, leftY), (rightX, rightY) = car
+            if leftY in rows or any(x in columns for x in range(leftX, rightX + 1)):
+                horizontal.remove(car)
+                relevant_horizontal.append(car)
+                rows.add(leftY)
+                changed = True
+        for car in list(vertical):
+            name, (topX, topY), (bottomX, bottomY) = car
+            if topX in columns or any(y in rows for y in range(topY, bottomY + 1)):
+                vertical.remove(car)
+                relevant_vertical.append(car)
+                columns.add(topX)
+                changed = True
+    # keep the order of the board, which is the order of the propositions and the actions of the domain
+    return (
+        [car for car in horizontal_vehicles if car in relevant_horizontal],
+        [car for car in vertical_vehicles if car in relevant_vertical],
+    )
+
+
 def create_propositions(
-    main_vehicle, horizontal_vehicles, vertical_vehicles, height, width
+    main_vehicle, horizontal_vehicles, vertical_vehicles, height, width, max_steps=1, encoding="ends"
 ):
+    # returns the proposition names of the domain and its actions (see create_move_lists),
+    # a car moves up to max_steps squares in a single action, encoding is one of ENCODINGS
+    check_max_steps(max_steps)
+    check_encoding(encoding)
     propositions = []
     actions = []
 
@@ -123,14 +232,14 @@ def create_propositions(
         left = 0
         right = length - 1
         while (left + length) < (width + 1):
-            propositions.append(f"{car}_left_{left}_{leftY}")
-            propositions.append(f"{car}_right_{right}_{rightY}")
+            propositions.extend(position_propositions(car, "left", "right", left, leftY, right, rightY, encoding))
 
-            if right < width - 1:
-                actions.append(create_move(car, "right", left, leftY, right + 1, leftY))
+            for steps in range(1, max_steps + 1):
+                if right + steps < width:
+                    actions.append(create_move_lists(car, "right", left, leftY, right + steps, leftY, steps, encoding))
 
-            if left > 0:
-                actions.append(create_move(car, "left", right, leftY, left - 1, leftY))
+                if left - steps >= 0:
+                    actions.append(create_move_lists(car, "left", right, leftY, left - steps, leftY, steps, encoding))
 
             left += 1
             right += 1
@@ -141,14 +250,14 @@ def create_propositions(
         top = 0
         bottom = length - 1
         while (top + length) < (height + 1):
-            propositions.append(f"{car}_up_{topX}_{top}")
-            propositions.append(f"{car}_down_{bottomX}_{bottom}")
+            propositions.extend(position_propositions(car, "up", "down", topX, top, bottomX, bottom, encoding))
 
-            if bottom < height - 1:
-                actions.append(create_move(car, "down", topX, top, topX, bottom + 1))
+            for steps in range(1, max_steps + 1):
+                if bottom + steps < height:
+                    actions.append(create_move_lists(car, "down", topX, top, topX, bottom + steps, steps, encoding))
 
-            if top > 0:
-                actions.append(create_move(car, "up", topX, bottom, topX, top - 1))
+                if top - steps >= 0:
+                    actions.append(create_move_lists(car, "up", topX, bottom, topX, top - steps, steps, encoding))
 
             top += 1
             bottom += 1
@@ -159,18 +268,20 @@ def create_propositions(
     main_left = 0
     main_right = main_length - 1
     while (main_left + main_length) < (width + 1):
-        propositions.append(f"X_left_{main_left}_{main_y}")
-        propositions.append(f"X_right_{main_right}_{main_y}")
+        propositions.extend(
+            position_propositions("X", "left", "right", main_left, main_y, main_right, main_y, encoding)
+        )
 
-        if main_right < width - 1:
-            actions.append(
-                create_move("X", "right", main_left, main_y, main_right + 1, main_y)
-            )
+        for steps in range(1, max_steps + 1):
+            if main_right + steps < width:
+                actions.append(
+                    create_move_lists("X", "right", main_left, main_y, main_right + steps, main_y, steps, encoding)
+                )
 
-        if main_left > 0:
-            actions.append(
-                create_move("X", "left", main_right, main_y, main_left - 1, main_y)
-            )
+            if main_left - steps >= 0:
+                actions.append(
+                    create_move_lists("X", "left", main_right, main_y, main_left - steps, main_y, steps, encoding)
+                )
 
         main_left += 1
         main_right += 1
@@ -178,6 +289,54 @@ def create_propositions(
     return propositions, actions
 
 
+def create_mutex_groups(main_vehicle, horizontal_vehicles, vertical_vehicles, height, width, encoding="ends"):
+    """
+    Returns the invariant groups of the domain as lists of proposition names,
+    at most one proposition of a group holds in any state reachable from the board:
+    - a car is at a single position, so a single one of its position propositions holds
+      (of its left (up) ones and of its right (down) ones in the "ends" encoding),
+      and its left (up) proposition only holds with the right (down) proposition of the same position,
+    - a square is empty or covered by a single car, where a car covers the squares
+      between its left (up) and right (down) ends.
+    """
+    vehicles = []  # (position propositions, squares covered) of every position of every vehicle
+    main_length = main_vehicle[1][0] - main_vehicle[0][0] + 1
+    lanes = [("X", "left", "right", main_vehicle[0][1], main_length, width, True)]
+    for car, (leftX, leftY), (rightX, rightY) in horizontal_vehicles:
+        lanes.append((car, "left", "right", leftY, rightX - leftX + 1, width, True))
+    for car, (topX, topY), (bottomX, bottomY) in vertical_vehicles:
+        lanes.append((car, "up", "down", topX, bottomY - topY + 1, height, False))
+    for car, first, last, lane, length, size, horizontal in lanes:
+        positions = []
+        for start in range(size - length + 1):
+            end = start + length - 1
+            if horizontal:
+                squares = [(x, lane) for x in range(start, end + 1)]
+                props = position_propositions(car, first, last, start, lane, end, lane, encoding)
+            else:
+                squares = [(lane, y) for y in range(start, end + 1)]
+                props = position_propositions(car, first, last, lane, start, lane, end, encoding)
+            positions.append((props, squares))
+        vehicles.append(positions)
+
+    groups = []
+    covering = dict()  # square -> for each proposition of a position, the ones of the positions that cover it
+    for positions in vehicles:
+        kinds = list(zip(*[props for props, squares in positions]))  # the starts, and then the ends
+        groups.extend(list(kind) for kind in kinds)
+        for props, squares in positions:
+            if len(props) == 2:
+                groups.append([props[0]] + [other for other in kinds[1] if other != props[1]])
+            for square in squares:
+                covering.setdefault(square, [[] for _ in props])
+                for kind, prop in zip(covering[square], props):
+                    kind.append(prop)
+    for (x, y), kinds in covering.items():
+        for kind in kinds:
+            groups.append([f"{x}_{y}_empty"] + kind)
+    return groups
+
+
 def create_domain_file(
     domain_file_name,
     main_vehicle,
@@ -185,13 +344,17 @@ def create_domain_file(
     vertical_vehicles,
     height=6,
     width=6,
+    max_steps=1,
+    encoding="ends",
 ):
     propositions, actions = create_propositions(
-        main_vehicle, horizontal_vehicles, vertical_vehicles, height, width
+        main_vehicle, horizontal_vehicles, vertical_vehicles, height, width, max_steps, encoding
     )
+    groups = create_mutex_groups(main_vehicle, horizontal_vehicles, vertical_vehicles, height, width, encoding)
     with open(domain_file_name, "w") as domain_file:
         domain_file.write("Propositions:\n" + " ".join(propositions))
-        domain_file.write("\nActions:\n" + "\n".join(actions))
+        domain_file.write("\nActions:\n" + "\n".join(format_move(*action) for action in actions))
+        domain_file.write("\nMutex groups:\n" + "\n".join("Group: " + " ".join(group) for group in groups))
 
 
 def create_problem_file(
@@ -202,7 +365,27 @@ def create_problem_file(
     empty_squares,
     height=6,
     width=6,
+    encoding="ends",
 ):
+    initial_state, goal_state = create_problem(
+        main_vehicle, horizontal_vehicles, vertical_vehicles, empty_squares, height, width, encoding
+    )
+    with open(problem_file_name, "w") as problem_file:
+        problem_file.write("Initial State: " + " ".join(initial_state))
+        problem_file.write("\nGoal State: " + " ".join(goal_state))
+
+
+def create_problem(
+    main_vehicle,
+    horizontal_vehicles,
+    vertical_vehicles,
+    empty_squares,
+    height=6,
+    width=6,
+    encoding="ends",
+):
+    # returns the initial state and the goal state as lists of proposition names
+    check_encoding(encoding)
     initial_state = []
     goal_state = []
 
@@ -212,20 +395,69 @@ def create_problem_file(
 
     # horizontal vehicles propositions
     for car, (leftX, leftY), (rightX, rightY) in horizontal_vehicles:
-        initial_state.append(f"{car}_left_{leftX}_{leftY}")
-        initial_state.append(f"{car}_right_{rightX}_{rightY}")
+        initial_state.extend(position_propositions(car, "left", "right", leftX, leftY, rightX, rightY, encoding))
 
     # vertical vehicles propositions
     for car, (topX, topY), (bottomX, bottomY) in vertical_vehicles:
-        initial_state.append(f"{car}_up_{topX}_{topY}")
-        initial_state.append(f"{car}_down_{bottomX}_{bottomY}")
+        initial_state.extend(position_propositions(car, "up", "down", topX, topY, bottomX, bottomY, encoding))
 
     # main_vehicle propositions
-    initial_state.append(f"X_left_{main_vehicle[0][0]}_{main_vehicle[0][1]}")
-    initial_state.append(f"X_right_{main_vehicle[1][0]}_{main_vehicle[1][1]}")
-
-    goal_state.append(f"X_right_{width - 1}_{main_vehicle[1][1]}")
-
-    with open(problem_file_name, "w") as problem_file:
-        problem_file.write("Initial State: " + " ".join(initial_state))
-        problem_file.write("\nGoal State: " + " ".join(goal_state))
+    (leftX, leftY), (rightX, rightY) = main_vehicle
+    initial_state.extend(position_propositions("X", "left", "right", leftX, leftY, rightX, rightY, encoding))
+
+    if encoding == "compact":
+        goal_state.append(f"X_at_{width - (rightX - leftX + 1)}_{leftY}")
+    else:
+        goal_state.append(f"X_right_{width - 1}_{rightY}")
+
+    return initial_state, goal_state
+
+
+def create_domain_and_problem(content, height=6, width=6, prune_vehicles=True, max_steps=1, encoding="ends"):
+    """
+    Returns the domain and the problem of a board in memory, in the form that GraphPlan
+    (and PgParser) accept in place of the domain and problem file names,
+    the domain holds the invariant groups of the board (see create_mutex_groups).
+    content is the list of the rows of the board (without the size line).
+    When prune_vehicles is true, the vehicles that can never block X are left out (see relevant_vehicles),
+    a car slides up to max_steps squares in a single action (see create_move_lists)
+    and encoding is one of ENCODINGS.
+    Raises ValueError if max_steps is not a positive integer or encoding is unknown
+    """
+    check_max_steps(max_steps)
+    check_encoding(encoding)
+    main_vehicle, horizontal_vehicles, vertical_vehicles, empty_squares = parse_vehicle_list(content)
+    if prune_vehicles:
+        horizontal_vehicles, vertical_vehicles = relevant_vehicles(
+            main_vehicle, horizontal_vehicles, vertical_vehicles
+        )
+    propositions, actions = create_propositions(
+        main_vehicle, horizontal_vehicles, vertical_vehicles, height, width, max_steps, encoding
+    )
+    groups = create_mutex_groups(main_vehicle, horizontal_vehicles, vertical_vehicles, height, width, encoding)
+    domain = (propositions, actions, groups)
+    problem = create_problem(
+        main_vehicle, horizontal_vehicles, vertical_vehicles, empty_squares, height, width, encoding
+    )
+    return domain, problem
+
+
+def compile_board(content, height=6, width=6, cache_dir=None, max_steps=1, encoding="ends"):
+    """
+    Returns the compiled problem of a board (see compiled_domain.CompiledDomain),
+    content is the list of the rows of the board (without the size line),
+    max_steps is the longest slide of a single action (see create_move_lists) and encoding one of ENCODINGS.
+    When cache_dir is given, the compiled problem is stored there in a file named after the hash of
+    the board, its size, max_steps and encoding, and later calls load it instead of compiling the board again.
+    Raises ValueError if max_steps is not a positive integer or encoding is unknown
+    """
+    check_max_steps(max_steps)
+    check_encoding(encoding)
+
+    def build():
+        return create_domain_and_problem(content, height, width, max_steps=max_steps, encoding=encoding)
+
+    if cache_dir is None:
+        return CompiledDomain.compile(*build())
+    path = os.path.join(cache_dir, board_key(content, height, width, max_steps, encoding) + ".gpcd")
+    return load_or_compile(path, build)
@@ -0,0 +1,160 @@
+"""
+Plan extraction with a SAT solver (the "sat" extraction mode of GraphPlan): the planning graph is encoded
+as CNF (see GraphEncoding.encode_level), the goals are assumed true in the last level, and a model of the
+clauses is a plan (see GraphEncoding.plan).
+
+The levels of the graph never change once expanded, so the encoding is incremental: every level is
+encoded once into the same solver (see sat_solver.SatSolver), and the clauses learned while looking
+for a plan of k levels are kept when the graph is expanded and a plan of k + 1 levels is looked for.
+
+The solver is written in Python and is slower than the backward search at finding the plans of the
+boards, the mode is an alternative extraction (a cross-check of the backward search, or a way past
+the levels where it stalls on some boards), not a faster one.
+"""
+
+from planning.sat_solver import SatSolver
+from planning.util import iter_bits
+
+
+class GraphEncoding(object):
+    """
+    The CNF encoding of the levels of the planning graph of a GraphPlan
+    """
+
+    def __init__(self, gp):
+        """
+        Constructor
+        """
+        self.gp = gp
+        self.solver = SatSolver()
+        self.fact_vars = []  # level -> dict from a proposition index to its variable in that level
+        self.action_vars = []  # level -> dict from an action or noOp index (see GraphPlan.create_noops) to its variable
+
+    def encode(self, graph, level):
+        """
+        Encodes the levels of the graph up to level that are not encoded yet
+        """
+        while len(self.fact_vars) <= level:
+            self.encode_level(graph, len(self.fact_vars))
+
+    def encode_level(self, graph, level):
+        """
+        Encodes a level of the graph: a variable per proposition of the proposition layer and per action
+        and noOp of the action layer, true if the plan uses it in that level, and the clauses
+        - an action implies its preconditions in the previous level,
+        - a proposition implies one of its producers (the initial state is true in the first level),
+        - two interfering actions (see GraphPlan.independent) or mutex propositions are not both true.
+        The actions with competing needs are not encoded as mutexes, unit propagation already
+        deduces them from the preconditions and the mutexes of the previous level
+        """
+        solver = self.solver
+        actions = self.gp.actions
+        n_actions = len(actions)
+        plan_graph_level = graph[level]
+        proposition_layer = plan_graph_level.get_proposition_layer()
+        facts = {index: solver.new_var() for index in iter_bits(proposition_layer.get_mask())}
+        self.fact_vars.append(facts)
+        if level == 0:
+            self.action_vars.append(dict())
+            for var in facts.values():
+                solver.add_clause([var])
+            return
+
+        previous_facts = self.fact_vars[level - 1]
+        action_layer = plan_graph_level.get_action_layer()
+        persisting = plan_graph_level.get_persisting()
+        acts = dict()
+        for index in iter_bits(action_layer.get_mask()):
+            var = acts[index] = solver.new_var()
+            for prop in actions[index].get_pre():
+                solver.add_clause([-var, previous_facts[prop.index]])
+        for index in iter_bits(persisting):
+            var = acts[n_actions + index] = solver.new_var()
+            solver.add_clause([-var, previous_facts[index]])
+        self.action_vars.append(acts)
+
+        for index, var in facts.items():
+            producers = [acts[i] for i in iter_bits(action_layer.add_index.get(index, 0))]
+            if (persisting >> index) & 1:
+                producers.append(acts[n_actions + index])
+            solver.add_clause([-var] + producers)
+
+        interference = self.gp.interference
+        deleters = dict()
+        for index, var in acts.items():
+            if index < n_actions:
+                others = interference[index] & ~((2 << index) - 1)
+                for prop in actions[index].get_delete():
+                    deleters.setdefault(prop.index, []).append(var)
+            else:
+                others = 0
+            for other in iter_bits(others):
+                other_var = acts.get(other)
+                if other_var is not None:
+                    solver.add_clause([-var, -other_var])
+        for index, vars_ in deleters.items():
+            noop = acts.get(n_actions + index)
+            if noop is not None:
+                for var in vars_:
+                    solver.add_clause([-var, -noop])
+
+        mutex_props = proposition_layer.get_mutex_props()
+        for index, var in facts.items():
+            for other in iter_bits(mutex_props.get_row(index) >> (index + 1)):
+                other_var = facts.get(index + 1 + other)
+                if other_var is not None:
+                    solver.add_clause([-var, -other_var])
+
+    def solve(self, graph, goal, level, tick=None):
+        """
+        Returns a plan of level levels for the goal (a list of propositions), or None if there is none,
+        tick is called at every conflict of the solver (see SatSolver.solve)
+        """
+        self.encode(graph, level)
+        facts = self.fact_vars[level]
+        if any(prop.index not in facts for prop in goal):
+            return None
+        if not self.solver.solve([facts[prop.index] for prop in goal], tick):
+            return None
+        return self.plan(goal, level)
+
+    def plan(self, goal, level):
+        """
+        Returns the plan of the last model found: going back from the goal, every needed proposition is
+        provided by its noOp if the model uses it, by an action of the model that adds it otherwise,
+        so the actions of the model that are not needed are left out.
+        The plan is a list of actions and noOps, the ones of the first level first (like GraphPlan.extract)
+        """
+        solver = self.solver
+        actions = self.gp.actions
+        noops = self.gp.noops
+        n_actions = len(actions)
+        needed = sorted(prop.index for prop in goal)
+        levels = []
+        for current in range(level, 0, -1):
+            acts = self.action_vars[current]
+            chosen = []
+            provided = 0
+            for index in needed:
+                if (provided >> index) & 1:
+                    continue
+                noop = acts.get(n_actions + index)
+                if noop is not None and solver.model_value(noop):
+                    action = noops[index]
+                else:
+                    action = next(
+                        actions[i]
+                        for i, var in acts.items()
+                        if i < n_actions and (actions[i].add_mask >> index) & 1 and solver.model_value(var)
+                    )
+                chosen.append(action)
+                provided |= action.add_mask
+            levels.append(chosen)
+            pre = 0
+            for action in chosen:
+                pre |= action.pre_mask
+            needed = list(iter_bits(pre))
+        plan = []
+        for chosen in reversed(levels):
+            plan.extend(chosen)
+        return plan
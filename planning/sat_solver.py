@@ -0,0 +1,384 @@
+"""
+A small CDCL SAT solver in pure Python, used to extract plans from the planning graph (see sat_extraction.py).
+
+Variables are positive ints (see new_var) and literals are DIMACS style ints: v for the variable v
+being true and -v for it being false. Internally a literal is coded as 2 * v for v and 2 * v + 1
+for -v, so that its negation is code ^ 1.
+
+The solver is incremental: clauses can be added between calls of solve, and solve takes assumptions,
+literals that are only true for that call, so the clauses learned in a call are kept for the next ones.
+It implements two watched literals propagation (binary clauses are kept apart as implications),
+first UIP conflict analysis with the minimization of the learned clauses, VSIDS decisions with
+phase saving, Luby restarts, and the deletion of the learned clauses of highest LBD (the number
+of decision levels of their literals) when there are too many of them.
+"""
+
+import heapq
+
+RESTART_UNIT = 100  # conflicts of the first restart interval, the intervals follow the Luby sequence
+VAR_DECAY = 0.95  # decay of the activities of the variables
+RESCALE = 1e100  # activities are rescaled above that value
+MAX_LEARNTS = 2000  # learned clauses kept before the first reduction (see reduce_learnts)
+LEARNTS_GROWTH = 1.1  # growth of the number of learned clauses kept at every reduction
+GLUE = 2  # learned clauses of at most that LBD are never deleted
+
+
+def luby(i):
+    # returns the i-th element (from 0) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
+    size, exponent = 1, 0
+    while size < i + 1:
+        exponent += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        exponent -= 1
+        i = i % size
+    return 1 << exponent
+
+
+class SatSolver(object):
+    """
+    An incremental CDCL SAT solver (see the module documentation)
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.n_vars = 0
+        self.value = [None, None]  # literal code -> True, False or None when unassigned
+        self.level = [0]  # variable -> decision level of its assignment
+        self.reason = [None]  # variable -> clause that implied its assignment, None for decisions
+        self.activity = [0.0]  # variable -> VSIDS activity
+        self.polarity = [False]  # variable -> last value assigned (phase saving)
+        self.seen = [False]  # variable -> mark of the conflict analysis
+        self.watches = [[], []]  # literal code -> clauses in which it is one of the two watched literals
+        self.implications = [[], []]  # literal code -> literal codes implied once it is false (binary clauses)
+        self.heap = []  # (-activity, variable) of the decision candidates, entries may be stale
+        self.in_heap = [False]  # variable -> true if the heap has an entry for it
+        self.trail = []  # literal codes assigned, in order
+        self.trail_lim = []  # decision level -> index in the trail of its first assignment
+        self.qhead = 0  # index in the trail of the next assignment to propagate
+        self.var_inc = 1.0
+        self.clauses = 0  # number of problem clauses
+        self.learnts = 0  # number of learned clauses
+        self.learnt_clauses = []  # (LBD, clause) of the learned clauses of more than two literals
+        self.max_learnts = MAX_LEARNTS
+        self.conflicts = 0
+        self.decisions = 0
+        self.ok = True  # false once the clauses are unsatisfiable (whatever the assumptions)
+        self.model = None  # variable -> value of the last model found
+
+    def new_var(self, phase=False):
+        """
+        Returns a new variable, phase is the value first tried when the solver decides it
+        """
+        self.n_vars += 1
+        self.value.extend((None, None))
+        self.level.append(0)
+        self.reason.append(None)
+        self.activity.append(0.0)
+        self.polarity.append(phase)
+        self.seen.append(False)
+        self.watches.extend(([], []))
+        self.implications.extend(([], []))
+        self.in_heap.append(True)
+        heapq.heappush(self.heap, (0.0, self.n_vars))
+        return self.n_vars
+
+    @staticmethod
+    def code(lit):
+        return 2 * lit if lit > 0 else -2 * lit + 1
+
+    def add_clause(self, lits):
+        """
+        Adds the clause (a list of literals), returns false if the clauses became unsatisfiable
+        """
+        if not self.ok:
+            return False
+        self.cancel_until(0)
+        value = self.value
+        clause = []
+        for code in set(map(self.code, lits)):
+            if value[code] is True or code ^ 1 in clause:
+                return True  # satisfied or tautological
+            if value[code] is None:
+                clause.append(code)
+        if not clause:
+            self.ok = False
+            return False
+        if len(clause) == 1:
+            self.enqueue(clause[0], None)
+            self.ok = self.propagate() is None
+            return self.ok
+        self.attach(clause)
+        self.clauses += 1
+        return True
+
+    def attach(self, clause):
+        if len(clause) == 2:
+            self.implications[clause[0]].append(clause[1])
+            self.implications[clause[1]].append(clause[0])
+        else:
+            self.watches[clause[0]].append(clause)
+            self.watches[clause[1]].append(clause)
+
+    def enqueue(self, code, reason):
+        self.value[code] = True
+        self.value[code ^ 1] = False
+        var = code >> 1
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(code)
+
+    def propagate(self):
+        """
+        Propagates the assignments of the trail, returns a conflicting clause or None
+        (the assignments are made inline rather than with enqueue, this is the hot loop of the solver)
+        """
+        value = self.value
+        level = self.level
+        reason = self.reason
+        watches = self.watches
+        implications = self.implications
+        trail = self.trail
+        current_level = len(self.trail_lim)
+        while self.qhead < len(trail):
+            false_code = trail[self.qhead] ^ 1
+            self.qhead += 1
+            for implied in implications[false_code]:
+                implied_value = value[implied]
+                if implied_value is None:
+                    value[implied] = True
+                    value[implied ^ 1] = False
+                    level[implied >> 1] = current_level
+                    reason[implied >> 1] = [implied, false_code]
+                    trail.append(implied)
+                elif implied_value is False:
+                    self.qhead = len(trail)
+                    return [implied, false_code]
+            watch_list = watches[false_code]
+            if not watch_list:
+                continue
+            kept = []
+            for position, clause in enumerate(watch_list):
+                first = clause[0]
+                if first == false_code:
+                    first = clause[0] = clause[1]
+                    clause[1] = false_code
+                if value[first] is True:
+                    kept.append(clause)
+                    continue
+                for index in range(2, len(clause)):
+                    other = clause[index]
+                    if value[other] is not False:
+                        clause[1] = other
+                        clause[index] = false_code
+                        watches[other].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if value[first] is False:
+                        kept.extend(watch_list[position + 1:])
+                        watches[false_code] = kept
+                        self.qhead = len(trail)
+                        return clause
+                    value[first] = True
+                    value[first ^ 1] = False
+                    level[first >> 1] = current_level
+                    reason[first >> 1] = clause
+                    trail.append(first)
+            watches[false_code] = kept
+        return None
+
+    def cancel_until(self, level):
+        """
+        Undoes the assignments of the decision levels above level
+        """
+        if len(self.trail_lim) <= level:
+            return
+        value = self.value
+        polarity = self.polarity
+        reason = self.reason
+        in_heap = self.in_heap
+        activity = self.activity
+        heap = self.heap
+        start = self.trail_lim[level]
+        for code in self.trail[start:]:
+            var = code >> 1
+            value[code] = None
+            value[code ^ 1] = None
+            polarity[var] = code & 1 == 0
+            reason[var] = None
+            if not in_heap[var]:
+                in_heap[var] = True
+                heapq.heappush(heap, (-activity[var], var))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def bump(self, var):
+        self.activity[var] += self.var_inc
+        if self.activity[var] > RESCALE:
+            self.activity = [activity / RESCALE for activity in self.activity]
+            self.var_inc /= RESCALE
+            self.heap = [(-self.activity[v], v) for v in range(1, self.n_vars + 1) if self.value[2 * v] is None]
+            heapq.heapify(self.heap)
+            self.in_heap = [False] + [self.value[2 * v] is None for v in range(1, self.n_vars + 1)]
+        elif self.in_heap[var]:
+            # the new entry makes the previous one stale (see pick_branch)
+            heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def analyze(self, conflict):
+        """
+        Returns the first UIP clause learned from the conflicting clause (its asserting literal first,
+        a literal of the backtrack level second) and the level to backtrack to
+        """
+        seen = self.seen
+        level = self.level
+        current_level = len(self.trail_lim)
+        learnt = [None]
+        counter = 0
+        code = None
+        clause = conflict
+        index = len(self.trail) - 1
+        while True:
+            for other in clause:
+                var = other >> 1
+                if code is not None and var == code >> 1:
+                    continue
+                if not seen[var] and level[var] > 0:
+                    seen[var] = True
+                    self.bump(var)
+                    if level[var] >= current_level:
+                        counter += 1
+                    else:
+                        learnt.append(other)
+            while not seen[self.trail[index] >> 1]:
+                index -= 1
+            code = self.trail[index]
+            index -= 1
+            clause = self.reason[code >> 1]
+            seen[code >> 1] = False
+            counter -= 1
+            if counter == 0:
+                break
+        learnt[0] = code ^ 1
+
+        # a literal is redundant when its reason only has literals of the clause (or of level 0)
+        minimized = [learnt[0]]
+        for other in learnt[1:]:
+            reason = self.reason[other >> 1]
+            if reason is None or any(
+                not seen[lit >> 1] and level[lit >> 1] > 0 for lit in reason if lit >> 1 != other >> 1
+            ):
+                minimized.append(other)
+        for other in learnt[1:]:
+            seen[other >> 1] = False
+
+        if len(minimized) == 1:
+            return minimized, 0
+        highest = max(range(1, len(minimized)), key=lambda i: level[minimized[i] >> 1])
+        minimized[1], minimized[highest] = minimized[highest], minimized[1]
+        return minimized, level[minimized[1] >> 1]
+
+    def reduce_learnts(self):
+        """
+        Deletes the learned clauses of highest LBD, keeping half of them and all the ones of LBD at most GLUE.
+        Only called at level 0, where no clause is the reason of an assignment that the conflict analysis reads
+        """
+        self.learnt_clauses.sort(key=lambda entry: entry[0])
+        cut = max(len(self.learnt_clauses) // 2, sum(1 for lbd, _ in self.learnt_clauses if lbd <= GLUE))
+        deleted = set(id(clause) for _, clause in self.learnt_clauses[cut:])
+        if deleted:
+            self.watches = [
+                [clause for clause in watch_list if id(clause) not in deleted] for watch_list in self.watches
+            ]
+        del self.learnt_clauses[cut:]
+        self.max_learnts = int(self.max_learnts * LEARNTS_GROWTH)
+
+    def pick_branch(self):
+        """
+        Returns the literal code of the next decision, None when every variable is assigned
+        """
+        heap = self.heap
+        value = self.value
+        while heap:
+            activity, var = heapq.heappop(heap)
+            if -activity != self.activity[var]:
+                continue  # stale, the variable has a newer entry
+            self.in_heap[var] = False
+            if value[2 * var] is None:
+                return 2 * var + (0 if self.polarity[var] else 1)
+        return None
+
+    def solve(self, assumptions=(), tick=None):
+        """
+        Returns true if the clauses are satisfiable with the assumptions (literals) true,
+        the model is then available with model_value.
+        tick, when given, is called at every conflict (and may raise to stop the search)
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        assumptions = [self.code(lit) for lit in assumptions]
+        restarts = 0
+        limit = RESTART_UNIT * luby(restarts)
+        conflicts = 0
+        try:
+            while True:
+                conflict = self.propagate()
+                if conflict is not None:
+                    self.conflicts += 1
+                    conflicts += 1
+                    if tick is not None:
+                        tick()
+                    if len(self.trail_lim) == 0:
+                        self.ok = False
+                        return False
+                    learnt, backtrack_level = self.analyze(conflict)
+                    self.cancel_until(backtrack_level)
+                    if len(learnt) == 1:
+                        self.enqueue(learnt[0], None)
+                    else:
+                        self.attach(learnt)
+                        self.learnts += 1
+                        if len(learnt) > 2:
+                            lbd = len(set(self.level[code >> 1] for code in learnt))
+                            self.learnt_clauses.append((lbd, learnt))
+                        self.enqueue(learnt[0], learnt)
+                    self.var_inc /= VAR_DECAY
+                    continue
+                if conflicts >= limit:
+                    restarts += 1
+                    limit = conflicts + RESTART_UNIT * luby(restarts)
+                    self.cancel_until(0)
+                    if len(self.learnt_clauses) > self.max_learnts:
+                        self.reduce_learnts()
+                    continue
+                code = None
+                while len(self.trail_lim) < len(assumptions):
+                    assumption = assumptions[len(self.trail_lim)]
+                    if self.value[assumption] is True:
+                        self.trail_lim.append(len(self.trail))  # an empty level keeps levels and assumptions aligned
+                    elif self.value[assumption] is False:
+                        return False
+                    else:
+                        code = assumption
+                        break
+                if code is None:
+                    code = self.pick_branch()
+                    if code is None:
+                        self.model = [None] + [self.value[2 * var] for var in range(1, self.n_vars + 1)]
+                        return True
+                    self.decisions += 1
+                self.trail_lim.append(len(self.trail))
+                self.enqueue(code, None)
+        finally:
+            self.cancel_until(0)
+
+    def model_value(self, var):
+        """
+        Returns the value of the variable var in the last model found
+        """
+        return self.model[var]
@@ -0,0 +1,194 @@
+"""
+Instrumentation of GraphPlan runs: a PlanStats object given to GraphPlan records, for every level
+of the planning graph, the number of propositions, actions, action mutexes and proposition mutexes,
+and the time spent in each phase of the expansion (see PHASES), and for every extraction attempt
+the number of calls of the backward search, the nogoods found and inserted, and the goal sets
+found already solved (see GraphPlan.extract).
+
+The records are available as Python dicts (levels, extractions), passed to a callback as they are
+made, and can be exported as JSON (see to_json) or as a Chrome trace (see to_chrome_trace),
+which chrome://tracing and https://ui.perfetto.dev display as a timeline.
+"""
+
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+PHASES = (
+    "update_action_layer",
+    "update_mutex_actions",
+    "update_proposition_layer",
+    "update_mutex_proposition",
+)
+# the phases of the expansion of a level (see PlanGraphLevel.expand)
+COUNTERS = ("extract_calls", "search_calls", "solved_hits")
+# the counters of an extraction attempt that GraphPlan updates with PlanStats.count
+
+EXPANSION_THREAD = 1  # trace thread of the expansion spans
+EXTRACTION_THREAD = 2  # trace thread of the extraction spans
+
+
+def phase(stats, name):
+    # returns a context manager that times the phase name in stats, that does nothing when stats is None
+    if stats is None:
+        return nullcontext()
+    return stats.phase(name)
+
+
+class PlanStats(object):
+    """
+    The statistics of a GraphPlan run (see the module documentation).
+    callback, when given, is called with ("level", record) once a level is expanded
+    and with ("extraction", record) after every extraction attempt.
+    """
+
+    def __init__(self, callback=None):
+        """
+        Constructor
+        """
+        self.callback = callback
+        self.origin = time.perf_counter()  # the time 0 of the trace
+        self.levels = []  # one record (dict) per level of the graph
+        self.extractions = []  # one record (dict) per extraction attempt
+        self.spans = []  # (name, thread, start, duration, args) of the trace, times in seconds from origin
+        self.phases = dict()  # phase -> seconds spent in the level being expanded
+        self.counters = dict()  # counter -> value in the extraction attempt in progress
+        self.extraction_start = None  # (start time, nogood hits, nogood inserts) of the attempt in progress
+
+    def now(self):
+        return time.perf_counter() - self.origin
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times the enclosed code as the phase name of the level being expanded
+        """
+        start = self.now()
+        try:
+            yield
+        finally:
+            duration = self.now() - start
+            self.phases[name] = self.phases.get(name, 0.0) + duration
+            self.spans.append((name, EXPANSION_THREAD, start, duration, None))
+
+    def end_level(self, level, plan_graph_level, start):
+        """
+        Records the expanded level (a PlanGraphLevel), whose expansion started at the time start (see now)
+        """
+        proposition_layer = plan_graph_level.get_proposition_layer()
+        action_layer = plan_graph_level.get_action_layer()
+        duration = self.now() - start
+        record = {
+            "level": level,
+            "propositions": proposition_layer.get_mask().bit_count(),
+            "actions": action_layer.get_mask().bit_count(),
+            "action_mutexes": len(action_layer.get_mutex_actions()),
+            "proposition_mutexes": len(proposition_layer.get_mutex_props()),
+            "expansion_s": duration,
+            "phases_s": {name: self.phases.get(name, 0.0) for name in PHASES},
+        }
+        self.phases = dict()
+        self.levels.append(record)
+        self.spans.append(("level %d" % level, EXPANSION_THREAD, start, duration, record))
+        if self.callback is not None:
+            self.callback("level", record)
+
+    def start_extraction(self, no_goods):
+        """
+        Starts an extraction attempt, no_goods are the nogood tables of the levels of the graph
+        """
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.extraction_start = (
+            self.now(),
+            sum(table.hits for table in no_goods),
+            sum(table.inserted for table in no_goods),
+        )
+
+    def count(self, name):
+        self.counters[name] += 1
+
+    def end_extraction(self, level, no_goods, plan):
+        """
+        Records the extraction attempt from level, plan is the plan found or None
+        """
+        start, hits, inserted = self.extraction_start
+        duration = self.now() - start
+        record = {
+            "level": level,
+            "found": plan is not None,
+            "extraction_s": duration,
+            "no_good_hits": sum(table.hits for table in no_goods) - hits,
+            "no_good_inserts": sum(table.inserted for table in no_goods) - inserted,
+        }
+        record.update(self.counters)
+        self.extractions.append(record)
+        self.spans.append(("extract level %d" % level, EXTRACTION_THREAD, start, duration, record))
+        if self.callback is not None:
+            self.callback("extraction", record)
+
+    def totals(self):
+        """
+        Returns the total expansion and extraction times, and the time spent in each phase, in seconds
+        """
+        result = {
+            "expansion_s": sum(record["expansion_s"] for record in self.levels),
+            "extraction_s": sum(record["extraction_s"] for record in self.extractions),
+        }
+        for name in PHASES:
+            result[name + "_s"] = sum(record["phases_s"][name] for record in self.levels)
+        return result
+
+    def to_dict(self):
+        return {"levels": self.levels, "extractions": self.extractions, "totals": self.totals()}
+
+    def to_json(self, path=None):
+        """
+        Returns the statistics as a JSON string, and writes it to path when given
+        """
+        text = json.dumps(self.to_dict(), indent=2)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+    def chrome_trace(self):
+        """
+        Returns the statistics in the Chrome trace event format: a complete event per phase, level
+        and extraction attempt, and a counter event per level with the sizes of the level
+        """
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": EXPANSION_THREAD, "args": {"name": "expansion"}},
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": EXTRACTION_THREAD, "args": {"name": "extraction"}},
+        ]
+        for name, thread, start, duration, args in self.spans:
+            event = {
+                "name": name,
+                "ph": "X",
+                "pid": 1,
+                "tid": thread,
+                "ts": start * 1e6,
+                "dur": duration * 1e6,
+            }
+            if args is not None:
+                event["args"] = args
+            events.append(event)
+            if thread == EXPANSION_THREAD and args is not None:
+                # the span of a level, its sizes are plotted as counters
+                sizes = ("propositions", "actions", "action_mutexes", "proposition_mutexes")
+                events.append(
+                    {
+                        "name": "graph size",
+                        "ph": "C",
+                        "pid": 1,
+                        "ts": (start + duration) * 1e6,
+                        "args": {key: args[key] for key in sizes},
+                    }
+                )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_chrome_trace(self, path):
+        """
+        Writes the statistics to path as a Chrome trace (see chrome_trace)
+        """
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
@@ -7,6 +7,8 @@ class Pair(object):
     It is used to represent mutexes (for both actions and propositions)
     """
 
+    __slots__ = ("a", "b")
+
     def __init__(self, a, b):
         """
         Constructor
@@ -29,3 +31,153 @@ class Pair(object):
 
     def __hash__(self):
         return hash(self.a) + hash(self.b)
+
+
+class MutexSet(object):
+    """
+    A set of mutex pairs stored as a bit-packed symmetric boolean matrix:
+    rows[i] is the bitset of the indices of the objects that are mutex with the object of index i.
+    It supports the operations used on plain sets of Pair objects (add, in, len and iteration),
+    and exposes the rows for the bitset / matrix computations of the plan graph levels.
+    A mutex set can be stored as a delta of the mutex set of the previous level (see set_delta_rows):
+    only the rows that changed are kept, the other ones are read from the base.
+    """
+
+    max_chain = 4  # a delta on top of that many deltas is flattened into a full set of rows
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.rows = dict()  # index -> bitset of the indices mutex with it (only the changed rows in a delta)
+        self.base = None  # the mutex set this one is a delta of
+        self.depth = 0  # number of deltas between this set and a full set of rows
+        self.objects = None  # index -> object (dict or list), used when iterating over the pairs
+        self.size = 0  # number of (unordered) pairs in the set
+
+    def add(self, pair):
+        i = pair.a.index
+        j = pair.b.index
+        if self.contains(i, j):
+            return
+        if self.objects is None:
+            self.objects = dict()
+        if isinstance(self.objects, dict):
+            self.objects[i] = pair.a
+            self.objects[j] = pair.b
+        self.rows[i] = self.get_row(i) | (1 << j)
+        self.rows[j] = self.get_row(j) | (1 << i)
+        self.size += 1
+
+    def contains(self, i, j):
+        """
+        Returns true if the objects with indices i and j are mutex
+        """
+        return (self.get_row(i) >> j) & 1 == 1
+
+    def get_row(self, i):
+        mutex_set = self
+        while mutex_set is not None:
+            row = mutex_set.rows.get(i)
+            if row is not None:
+                return row
+            mutex_set = mutex_set.base
+        return 0
+
+    def get_rows(self):
+        """
+        Returns all the rows as a dict, the result must not be modified
+        """
+        if self.base is None:
+            return self.rows
+        rows = dict(self.base.get_rows())
+        rows.update(self.rows)
+        return rows
+
+    def get_delta(self):
+        """
+        Returns the rows stored in this set, which are all the rows if it is not a delta
+        """
+        return self.rows
+
+    def is_delta_of(self, other):
+        return self.base is other
+
+    def set_rows(self, rows, objects):
+        """
+        Replaces the content of the set by the given (symmetric) rows,
+        objects maps every index that appears in the rows to its object
+        """
+        self.rows = rows
+        self.base = None
+        self.depth = 0
+        self.objects = objects
+        self.size = sum(row.bit_count() for row in rows.values()) // 2
+
+    def set_delta_rows(self, delta, base, objects):
+        """
+        Replaces the content of the set by the mutex set base where the rows in delta are replaced.
+        Rows that did not actually change are dropped, and the set is flattened
+        when the chain of deltas gets longer than max_chain
+        """
+        rows = dict()
+        size = 2 * base.size
+        for index, row in delta.items():
+            base_row = base.get_row(index)
+            if row != base_row:
+                rows[index] = row
+                size += row.bit_count() - base_row.bit_count()
+        self.rows = rows
+        self.base = base
+        self.depth = base.depth + 1
+        self.objects = objects
+        self.size = size // 2
+        if self.depth > MutexSet.max_chain:
+            self.rows = self.get_rows()
+            self.base = None
+            self.depth = 0
+
+    def __contains__(self, pair):
+        return self.contains(pair.a.index, pair.b.index)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for i, row in self.get_rows().items():
+            for j in iter_bits(row >> i << i):
+                yield Pair(self.objects[i], self.objects[j])
+
+    def __eq__(self, other):
+        return isinstance(other, self.__class__) and self.get_rows() == other.get_rows()
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+def to_mask(items):
+    """
+    Returns the int bitset of the given (interned) propositions or actions,
+    bit i is set iff the item with index i is in the list
+    """
+    mask = 0
+    for item in items:
+        mask |= 1 << item.index
+    return mask
+
+
+def iter_bits(mask):
+    """
+    Yields the indices of the bits that are set in the bitset mask, in increasing order
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def lowest_bit(mask):
+    """
+    Returns the index of the lowest bit that is set in the (non empty) bitset mask
+    """
+    return (mask & -mask).bit_length() - 1
@@ -0,0 +1,329 @@
+"""
+Tests of the GraphPlan planner (planning/), run with python3 -m pytest tests
+"""
+
+import os
+import pickle
+import random
+import sys
+import zlib
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from planning import checkpoint
+from planning.budget import BudgetExhausted, CancellationToken
+from planning.graph_plan import GraphPlan, parse_solution
+from planning.memory import MemoryTracker
+from planning.no_good_table import NoGoodTable
+from planning.proposition import Proposition
+from planning.rushhour import ENCODINGS, compile_board, create_domain_and_problem, read_board
+from planning.sat_solver import SatSolver
+from planning.util import MutexSet, Pair, iter_bits
+
+
+def pigeons(n_pigeons, n_holes):
+    # returns the in-memory domain and problem of putting every pigeon in a hole of its own (see PgParser),
+    # which has no plan when there are more pigeons than holes, while any two pigeons fit
+    propositions = ["free%d" % h for h in range(n_holes)]
+    propositions += ["out%d" % p for p in range(n_pigeons)] + ["placed%d" % p for p in range(n_pigeons)]
+    actions = [
+        ("put%d_%d" % (p, h), ["out%d" % p, "free%d" % h], ["placed%d" % p], ["out%d" % p, "free%d" % h])
+        for p in range(n_pigeons)
+        for h in range(n_holes)
+    ]
+    initial_state = ["free%d" % h for h in range(n_holes)] + ["out%d" % p for p in range(n_pigeons)]
+    goal = ["placed%d" % p for p in range(n_pigeons)]
+    return (propositions, actions), (initial_state, goal)
+
+
+def test_no_plan_with_bounded_nogoods():
+    # the nogoods of the level at which the graph levelled off are never evicted, so the run proves
+    # that there is no plan even when every other level keeps a single nogood
+    for max_no_goods in (None, 1, 2):
+        gp = GraphPlan(*pigeons(3, 2), max_no_goods=max_no_goods)
+        assert gp.graph_plan(max_levels=20) is None
+        assert gp.no_goods[gp.fixed_level].max_size is None
+
+
+class Crafted(object):
+    # an object whose unpickling calls a function, like a malicious checkpoint would
+    def __reduce__(self):
+        return os.getcwd, ()
+
+
+def test_checkpoint_refuses_globals(tmp_path):
+    path = str(tmp_path / "run.gpck")
+    gp = GraphPlan(*pigeons(3, 2))
+    gp.graph_plan(checkpoint=path)
+    with open(path, "rb") as f:
+        content = f.read()
+    magic, version, domain_size, data_size = checkpoint.HEADER.unpack_from(content, 0)
+    data = zlib.compress(pickle.dumps(Crafted()))
+    crafted = checkpoint.HEADER.pack(magic, version, domain_size, len(data))
+    with open(path, "wb") as f:
+        f.write(crafted + content[checkpoint.HEADER.size: checkpoint.HEADER.size + domain_size] + data)
+    with pytest.raises(ValueError, match="not allowed"):
+        checkpoint.load_checkpoint(path)
+
+
+def read_board_file(name):
+    with open(os.path.join(ROOT, "boards", name + ".txt")) as f:
+        return read_board(f.read().splitlines())
+
+
+def replay(gp, plan):
+    # applies the actions of the plan in order from the initial state, checking their preconditions,
+    # and returns true if the goal holds at the end
+    state = {prop.name for prop in gp.initial_state}
+    for act in plan:
+        if act.is_noop():
+            continue
+        assert {prop.name for prop in act.get_pre()} <= state, act.name
+        state -= {prop.name for prop in act.get_delete()}
+        state |= {prop.name for prop in act.get_add()}
+    return {prop.name for prop in gp.goal} <= state
+
+
+def replay_board(rows, moves):
+    # plays the (car, DIRECTION, steps, player) moves of parse_solution on the board one square at a time,
+    # checking that the car only slides onto empty squares, and returns true if X ends at the exit
+    grid = [list(row) for row in rows]
+    offsets = {"UP": (-1, 0), "DOWN": (1, 0), "LEFT": (0, -1), "RIGHT": (0, 1)}
+    for car, direction, steps, _ in moves:
+        dy, dx = offsets[direction]
+        for _ in range(steps):
+            cells = [(y, x) for y, row in enumerate(grid) for x, cell in enumerate(row) if cell == car]
+            assert cells, car
+            for y, x in cells:
+                ny, nx = y + dy, x + dx
+                assert 0 <= ny < len(grid) and 0 <= nx < len(grid[0]), (car, direction)
+                assert grid[ny][nx] in (".", car), (car, direction)
+            for y, x in cells:
+                grid[y][x] = "."
+            for y, x in cells:
+                grid[y + dy][x + dx] = car
+    return any(row[-1] == "X" for row in grid)
+
+
+def solve(name, **options):
+    rows, height, width = read_board_file(name)
+    gp = GraphPlan(compile_board(rows, height, width, encoding=options.pop("encoding", "ends")), None, **options)
+    plan = gp.graph_plan(time_limit=60)
+    assert isinstance(plan, list), plan
+    assert replay(gp, plan)
+    assert replay_board(rows, parse_solution(plan))
+    return gp, plan
+
+
+def cost(plan):
+    return len([act for act in plan if not act.is_noop()])
+
+
+@pytest.mark.parametrize("board", ["sample1", "sample2", "test_board", "1", "2"])
+def test_extraction_modes_agree(board):
+    # every mode finds a plan that replays, at the same level of the graph, and branch and bound
+    # finds a plan with the fewest actions for that level
+    levels = dict()
+    costs = dict()
+    for mode in ("first", "all", "branch_and_bound"):
+        gp, plan = solve(board, extraction=mode)
+        levels[mode] = len(gp.graph)
+        costs[mode] = cost(plan)
+    assert len(set(levels.values())) == 1
+    assert costs["branch_and_bound"] <= costs["first"]
+    assert costs["branch_and_bound"] <= costs["all"]
+
+
+def test_max_steps_must_be_positive():
+    rows, height, width = read_board_file("sample1")
+    for max_steps in (0, -1):
+        with pytest.raises(ValueError):
+            compile_board(rows, height, width, max_steps=max_steps)
+
+
+def test_resumed_run_counts_restored_nogoods(tmp_path):
+    path = str(tmp_path / "run.gpck")
+    gp = GraphPlan(*pigeons(5, 4))
+    assert isinstance(gp.graph_plan(checkpoint=path, max_nodes=300), BudgetExhausted)
+    restored = sum(table.size_bytes() for table in gp.no_goods)
+    assert restored > 0
+    memory = MemoryTracker()
+    resumed = checkpoint.load_checkpoint(path, memory=memory)
+    assert isinstance(resumed.graph_plan(resume=True, max_nodes=1), BudgetExhausted)
+    assert memory.no_goods_bytes >= restored
+
+
+# the levels of the graph and the number of actions of the plan of the first extraction, for every encoding
+EXPECTED = {
+    "sample1": (5, 6),
+    "sample2": (8, 7),
+    "test_board": (4, 3),
+    "1": (9, 16),
+    "2": (8, 14),
+}
+
+
+def level_signature(gp):
+    # returns, level by level, the propositions, the proposition mutexes, the actions and the action mutexes
+    signature = []
+    for plan_graph_level in gp.graph:
+        layer = plan_graph_level.get_proposition_layer()
+        props = layer.get_propositions()
+        prop_mutexes = {(p.index, q.index) for p in props for q in props if layer.is_mutex(p, q)}
+        actions = plan_graph_level.get_action_layer().get_mask()
+        action_mutexes = {index: plan_graph_level.get_mutex_row(index) for index in iter_bits(actions)}
+        signature.append((layer.get_mask(), prop_mutexes, actions, action_mutexes))
+    return signature
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("board", sorted(EXPECTED))
+def test_levels_and_plans(board, encoding):
+    gp, plan = solve(board, encoding=encoding)
+    assert (len(gp.graph), cost(plan)) == EXPECTED[board]
+
+
+@pytest.mark.parametrize("board", sorted(EXPECTED))
+def test_mutex_modes_and_static_mutexes_agree(board):
+    # the pairs and bitset mutex modes build the same levels, and seeding the invariants of the board
+    # as static mutexes gives the mutexes that the expansion derives without them
+    rows, height, width = read_board_file(board)
+    domain, problem = create_domain_and_problem(rows, height, width)
+    signatures = []
+    for build in (
+        lambda: GraphPlan(compile_board(rows, height, width), None),
+        lambda: GraphPlan(compile_board(rows, height, width), None, mutex_mode="pairs"),
+        lambda: GraphPlan(domain[:2], problem),
+    ):
+        # the planners are built and read one at a time (the tables of the problem are class attributes)
+        gp = build()
+        gp.graph_plan()
+        signatures.append(level_signature(gp))
+    assert signatures[1] == signatures[0]
+    assert signatures[2] == signatures[0]
+
+
+@pytest.mark.parametrize("board", ["sample2", "2"])
+def test_pruning_keeps_the_plans(board):
+    # every planner gets its own domain (the indexes of the propositions and the actions are set on them)
+    # and is built just before it runs (the tables of the problem are class attributes of PlanGraphLevel)
+    rows, height, width = read_board_file(board)
+    n_actions = []
+    for prune in (True, False):
+        gp = GraphPlan(*create_domain_and_problem(rows, height, width), prune=prune)
+        plan = gp.graph_plan()
+        assert replay(gp, plan)
+        assert (len(gp.graph), cost(plan)) == EXPECTED[board]
+        n_actions.append(len(gp.actions))
+    assert n_actions[0] <= n_actions[1]
+
+
+def test_sat_extraction():
+    for board in ("sample1", "test_board", "2"):
+        gp, plan = solve(board, extraction="sat")
+        assert len(gp.graph) == EXPECTED[board][0]
+    assert GraphPlan(*pigeons(4, 3), extraction="sat").graph_plan(max_levels=20) is None
+
+
+def test_compiled_domain_cache(tmp_path):
+    rows, height, width = read_board_file("2")
+    compiled = compile_board(rows, height, width, cache_dir=str(tmp_path))
+    assert len(os.listdir(str(tmp_path))) == 1
+    cached = compile_board(rows, height, width, cache_dir=str(tmp_path))
+    assert cached.to_bytes() == compiled.to_bytes()
+    assert [act.name for act in cached.actions] == [act.name for act in compiled.actions]
+    assert cached.interference == compiled.interference
+    assert cached.static_mutex == compiled.static_mutex
+    gp = GraphPlan(cached, None)
+    plan = gp.graph_plan()
+    assert replay(gp, plan)
+    assert (len(gp.graph), cost(plan)) == EXPECTED["2"]
+
+
+def test_checkpoint_resume(tmp_path):
+    path = str(tmp_path / "run.gpck")
+    rows, height, width = read_board_file("2")
+    gp = GraphPlan(compile_board(rows, height, width), None)
+    stopped = gp.graph_plan(checkpoint=path, max_levels=6)
+    assert isinstance(stopped, BudgetExhausted) and stopped.reason == "levels"
+    resumed = checkpoint.load_checkpoint(path)
+    assert len(resumed.graph) == 7
+    plan = resumed.graph_plan(resume=True)
+    assert replay(resumed, plan)
+    assert (len(resumed.graph), cost(plan)) == EXPECTED["2"]
+
+
+def test_budgets():
+    rows, height, width = read_board_file("2")
+    compiled = compile_board(rows, height, width)
+    token = CancellationToken()
+    token.cancel()
+    for budget, reason in (
+        ({"max_levels": 3}, "levels"),
+        ({"max_nodes": 5}, "nodes"),
+        ({"time_limit": 0}, "time"),
+        ({"cancel": token}, "cancelled"),
+    ):
+        result = GraphPlan(compiled, None).graph_plan(**budget)
+        assert isinstance(result, BudgetExhausted) and result.reason == reason
+
+
+def test_no_good_table():
+    table = NoGoodTable(max_size=2)
+    table.add(0b0011)
+    assert table.is_no_good(0b0111)  # a superset of a nogood
+    assert not table.is_no_good(0b0101)
+    table.add(0b0100)
+    table.add(0b1000)  # evicts the least recently used nogood, 0b0011
+    assert len(table) == 2 and table.inserted == 3
+    assert not table.is_no_good(0b0011)
+    assert table.is_no_good(0b1100)
+
+
+def test_mutex_set():
+    props = [Proposition("p%d" % i) for i in range(4)]
+    for index, prop in enumerate(props):
+        prop.index = index
+    base = MutexSet()
+    base.add(Pair(props[0], props[1]))
+    base.add(Pair(props[1], props[0]))
+    assert len(base) == 1 and Pair(props[1], props[0]) in base
+    delta = MutexSet()
+    delta.set_delta_rows({2: 0b1000, 3: 0b0100}, base, props)
+    assert delta.contains(0, 1) and delta.contains(3, 2) and not delta.contains(0, 2)
+    assert len(delta) == 2 and delta.is_delta_of(base)
+    assert {(pair.a.index, pair.b.index) for pair in delta} == {(0, 1), (2, 3)}
+
+
+def brute_force(n_vars, clauses):
+    # returns true if the clauses (lists of literals over variables 1 to n_vars) are satisfiable
+    for bits in range(1 << n_vars):
+        if all(any((lit > 0) == bool(bits >> (abs(lit) - 1) & 1) for lit in clause) for clause in clauses):
+            return True
+    return False
+
+
+def test_sat_solver():
+    rng = random.Random(0)
+    for _ in range(100):
+        n_vars = rng.randint(3, 10)
+        clauses = [
+            [rng.choice((-1, 1)) * rng.randint(1, n_vars) for _ in range(3)] for _ in range(rng.randint(5, 45))
+        ]
+        solver = SatSolver()
+        for _ in range(n_vars):
+            solver.new_var()
+        for clause in clauses:
+            solver.add_clause(clause)
+        satisfiable = solver.solve()
+        assert satisfiable == brute_force(n_vars, clauses)
+        if satisfiable:
+            assert all(any(solver.model_value(abs(lit)) == (lit > 0) for lit in clause) for clause in clauses)
+            # solving again under assumptions keeps the clauses and honors the assumptions
+            assumptions = [rng.choice((-1, 1)) * rng.randint(1, n_vars) for _ in range(2)]
+            expected = brute_force(n_vars, clauses + [[lit] for lit in assumptions])
+            assert solver.solve(assumptions) == expected
+            assert solver.solve() is True